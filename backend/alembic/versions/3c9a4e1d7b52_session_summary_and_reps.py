@@ -0,0 +1,59 @@
+"""session summary and reps
+
+Revision ID: 3c9a4e1d7b52
+Revises: feef8381a4c1
+Create Date: 2026-10-18 10:12:41.305118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9a4e1d7b52'
+down_revision: Union[str, Sequence[str], None] = 'feef8381a4c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_exercise_scores', sa.Column('session_id', sa.String(length=36), nullable=True))
+    op.add_column('user_exercise_scores', sa.Column('total_reps', sa.Integer(), nullable=True))
+    op.add_column('user_exercise_scores', sa.Column('good_reps', sa.Integer(), nullable=True))
+    op.add_column('user_exercise_scores', sa.Column('average_rep_time', sa.Float(), nullable=True))
+    op.create_index(op.f('ix_user_exercise_scores_session_id'), 'user_exercise_scores', ['session_id'], unique=False)
+
+    op.create_table(
+        'user_exercise_reps',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('session_id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('exercise_id', sa.Integer(), nullable=False),
+        sa.Column('rep', sa.Integer(), nullable=False),
+        sa.Column('start_frame', sa.Integer(), nullable=True),
+        sa.Column('end_frame', sa.Integer(), nullable=True),
+        sa.Column('duration', sa.Float(), nullable=False),
+        sa.Column('min_value', sa.Float(), nullable=True),
+        sa.Column('max_value', sa.Float(), nullable=True),
+        sa.Column('good', sa.Boolean(), nullable=False),
+        sa.Column('feedback', sa.String(length=100), nullable=True),
+        sa.Column('timestamp', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['exercise_id'], ['exercises.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_exercise_reps_session_id'), 'user_exercise_reps', ['session_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_exercise_reps_session_id'), table_name='user_exercise_reps')
+    op.drop_table('user_exercise_reps')
+    op.drop_index(op.f('ix_user_exercise_scores_session_id'), table_name='user_exercise_scores')
+    op.drop_column('user_exercise_scores', 'average_rep_time')
+    op.drop_column('user_exercise_scores', 'good_reps')
+    op.drop_column('user_exercise_scores', 'total_reps')
+    op.drop_column('user_exercise_scores', 'session_id')
@@ -0,0 +1,27 @@
+"""score history index
+
+Revision ID: 8e2f61b4c0a9
+Revises: 3c9a4e1d7b52
+Create Date: 2026-10-18 11:03:17.582904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2f61b4c0a9'
+down_revision: Union[str, Sequence[str], None] = '3c9a4e1d7b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_user_exercise_scores_user_id_timestamp', 'user_exercise_scores', ['user_id', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_exercise_scores_user_id_timestamp', table_name='user_exercise_scores')
@@ -0,0 +1,27 @@
+"""users role index
+
+Revision ID: b47d2c9e5f13
+Revises: 8e2f61b4c0a9
+Create Date: 2026-10-18 11:41:52.190637
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b47d2c9e5f13'
+down_revision: Union[str, Sequence[str], None] = '8e2f61b4c0a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_role_id', 'users', ['role', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_role_id', table_name='users')
@@ -0,0 +1,43 @@
+"""daily score rollups
+
+Revision ID: d5a8e3f27c64
+Revises: b47d2c9e5f13
+Create Date: 2026-10-18 12:26:08.447310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a8e3f27c64'
+down_revision: Union[str, Sequence[str], None] = 'b47d2c9e5f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fill with: python -m app.api.score_rollups
+    op.create_table(
+        'user_exercise_daily_scores',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('exercise_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('total', sa.BigInteger(), nullable=False),
+        sa.Column('min_score', sa.Integer(), nullable=False),
+        sa.Column('max_score', sa.Integer(), nullable=False),
+        sa.Column('last_score', sa.Integer(), nullable=False),
+        sa.Column('last_timestamp', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['exercise_id'], ['exercises.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'exercise_id', 'day')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_exercise_daily_scores')
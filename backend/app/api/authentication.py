@@ -57,7 +57,7 @@ async def login(request_data: schemas.Login_Request, db: Session = Depends(get_d
             detail="Incorrect username or password :-("
         )
     
-    access_token = create_access_token(data={"sub": user.username, "role": user.role})
+    access_token = create_access_token(data={"sub": user.username, "role": user.role, "id": user.id})
 
     return_payload = {"username": user.username, "role": user.role, "name": user.name, "id": user.id}
     if user.role == 'patient':
@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.responses import JSONResponse
 from app import schemas, models
 from app.db import get_db
-from app.api.utils import get_current_user
+from app.api.utils import get_current_user, Principal
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
@@ -11,7 +11,7 @@ router = APIRouter(prefix="/exercises")
 
 
 @router.get("/")
-async def get_all_exercises(user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_all_exercises(user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
 
     if user.role != "doctor":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="You are not authorised for this")
@@ -30,7 +30,7 @@ async def get_all_exercises(user: models.User = Depends(get_current_user), db: S
 
 
 @router.post("/create")
-async def create_new_exercise(request_data: schemas.Create_Exercise, user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_new_exercise(request_data: schemas.Create_Exercise, user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
 
     if user.role != "doctor":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="You are not authorised for this")
@@ -75,7 +75,7 @@ async def create_new_exercise(request_data: schemas.Create_Exercise, user: model
 
 
 @router.post("/assign")
-async def assign_exercise_to_patient(request_data: schemas.Assign_Exercise, user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def assign_exercise_to_patient(request_data: schemas.Assign_Exercise, user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
 
     if user.role != "doctor":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="You are not authorised for this")
@@ -122,7 +122,7 @@ async def assign_exercise_to_patient(request_data: schemas.Assign_Exercise, user
         )
 
 @router.delete("/deassign")
-async def deassign_exercise_from_patient(request_data: schemas.Deassign_Exercise, user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def deassign_exercise_from_patient(request_data: schemas.Deassign_Exercise, user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
 
     if user.role != "doctor":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="You are not authorised for this")
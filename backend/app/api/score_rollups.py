@@ -0,0 +1,157 @@
+"""
+Daily per-patient, per-exercise score rollups.
+
+Every score insert also calls `update_rollups()`, which folds the new rows
+into user_exercise_daily_scores with one upsert (MySQL, or SQLite and
+PostgreSQL for tests and local setups), so trend endpoints read a
+row per day instead of re-aggregating raw scores. Days are UTC.
+
+Rebuild the table from user_exercise_scores (e.g. after the migration, or
+for one patient) with
+
+    python -m app.api.score_rollups [--patient ID]
+"""
+import argparse
+from datetime import datetime, timezone
+from sqlalchemy import select, delete, func, case
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from app import models
+
+
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def score_day(timestamp):
+    """
+    UTC day of a millisecond timestamp.
+    """
+    return datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc).date()
+
+
+def aggregate_rows(rows):
+    """
+    Folds score rows (dicts with user_id, exercise_id, score, timestamp)
+    into one rollup row per (user_id, exercise_id, day).
+    """
+    rollups = {}
+    for row in rows:
+        key = (row["user_id"], row["exercise_id"], score_day(row["timestamp"]))
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollups[key] = {
+                "user_id": key[0],
+                "exercise_id": key[1],
+                "day": key[2],
+                "count": 1,
+                "total": row["score"],
+                "min_score": row["score"],
+                "max_score": row["score"],
+                "last_score": row["score"],
+                "last_timestamp": row["timestamp"],
+            }
+            continue
+        rollup["count"] += 1
+        rollup["total"] += row["score"]
+        rollup["min_score"] = min(rollup["min_score"], row["score"])
+        rollup["max_score"] = max(rollup["max_score"], row["score"])
+        if row["timestamp"] >= rollup["last_timestamp"]:
+            rollup["last_score"] = row["score"]
+            rollup["last_timestamp"] = row["timestamp"]
+    return list(rollups.values())
+
+
+def upsert_statement(dialect, rollups):
+    """
+    INSERT of rollup rows that merges into existing (user_id, exercise_id, day)
+    rows, in the given SQLAlchemy dialect's syntax.
+    """
+    table = models.UserExerciseDailyScore
+    if dialect == "mysql":
+        stmt = mysql.insert(table).values(rollups)
+        new = stmt.inserted
+        # MySQL applies these in order, so last_score is compared with the old
+        # last_timestamp before that is updated
+        return stmt.on_duplicate_key_update([
+            ("count", table.count + new.count),
+            ("total", table.total + new.total),
+            ("min_score", func.least(table.min_score, new.min_score)),
+            ("max_score", func.greatest(table.max_score, new.max_score)),
+            ("last_score", func.if_(new.last_timestamp >= table.last_timestamp, new.last_score, table.last_score)),
+            ("last_timestamp", func.greatest(table.last_timestamp, new.last_timestamp)),
+        ])
+
+    if dialect == "sqlite":
+        stmt = sqlite.insert(table).values(rollups)
+        least, greatest = func.min, func.max  # Scalar with two arguments
+    elif dialect == "postgresql":
+        stmt = postgresql.insert(table).values(rollups)
+        least, greatest = func.least, func.greatest
+    else:
+        raise ValueError(f"Score rollups are not supported on {dialect}")
+    new = stmt.excluded
+    # Every SET expression here reads the row as it was before the update
+    return stmt.on_conflict_do_update(
+        index_elements=[table.user_id, table.exercise_id, table.day],
+        set_={
+            "count": table.count + new.count,
+            "total": table.total + new.total,
+            "min_score": least(table.min_score, new.min_score),
+            "max_score": greatest(table.max_score, new.max_score),
+            "last_score": case((new.last_timestamp >= table.last_timestamp, new.last_score), else_=table.last_score),
+            "last_timestamp": greatest(table.last_timestamp, new.last_timestamp),
+        },
+    )
+
+
+def update_rollups(db, rows):
+    """
+    Adds score rows to the daily rollups in the caller's transaction, with
+    one upsert for the whole batch.
+    """
+    rollups = aggregate_rows(rows)
+    if not rollups:
+        return
+    db.execute(upsert_statement(db.get_bind().dialect.name, rollups))
+
+
+def backfill(db, patient_id=None):
+    """
+    Rebuilds the rollups from user_exercise_scores, for all patients or one.
+    Returns the number of scores read.
+    """
+    scores = models.UserExerciseScore
+    clear = delete(models.UserExerciseDailyScore)
+    query = select(scores.id, scores.user_id, scores.exercise_id, scores.score, scores.timestamp)
+    if patient_id is not None:
+        clear = clear.where(models.UserExerciseDailyScore.user_id == patient_id)
+        query = query.where(scores.user_id == patient_id)
+    db.execute(clear)
+
+    # Keyset pages on id, each read in full before its upsert runs on the
+    # same connection (a streamed result would be cut off by the first write)
+    count, last_id = 0, 0
+    while True:
+        page = db.execute(
+            query.where(scores.id > last_id).order_by(scores.id).limit(BACKFILL_CHUNK_SIZE)
+        ).mappings().all()
+        if not page:
+            break
+        update_rollups(db, page)
+        count += len(page)
+        last_id = page[-1]["id"]
+    db.commit()
+    return count
+
+
+if __name__ == "__main__":
+    from app.db import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild daily score rollups from user_exercise_scores")
+    parser.add_argument("--patient", type=int, default=None, help="Only rebuild this patient's rollups")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(f"Rolled up {backfill(db, args.patient)} score(s)")
+    finally:
+        db.close()
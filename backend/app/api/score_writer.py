@@ -0,0 +1,221 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+from sqlalchemy import select, insert, or_
+from starlette.concurrency import run_in_threadpool
+from app import models
+from app.db import SessionLocal
+from app.api.score_rollups import update_rollups
+
+
+# Config
+SCORE_QUEUE_SIZE = int(os.getenv("SCORE_QUEUE_SIZE", 1000))             # Sessions waiting to be written before new ones are dropped
+SCORE_BATCH_SIZE = int(os.getenv("SCORE_BATCH_SIZE", 100))              # Max sessions written in one transaction
+SCORE_FLUSH_INTERVAL = float(os.getenv("SCORE_FLUSH_INTERVAL", 0.5))    # Seconds to wait for more sessions before writing a batch
+SCORE_WRITE_RETRIES = int(os.getenv("SCORE_WRITE_RETRIES", 2))          # Batch retries before sessions are written one by one
+SCORE_RETRY_DELAY = float(os.getenv("SCORE_RETRY_DELAY", 0.5))          # Seconds before the first retry, doubled after each
+
+logger = logging.getLogger(__name__)
+
+
+def score_rows(sessions, db):
+    """
+    Builds the UserExerciseScore and UserExerciseRep rows for a batch of
+    finished sessions. Patients, users and exercises of the whole batch are
+    checked with one query each, sessions that fail the checks are skipped.
+    """
+    usernames = {s["username"] for s in sessions}
+    patient_ids = {s["patient_id"] for s in sessions}
+    exercise_ids = {s["exercise_id"] for s in sessions}
+
+    users = db.execute(
+        select(models.User.id, models.User.username, models.User.role)
+        .where(or_(models.User.username.in_(usernames), models.User.id.in_(patient_ids)))
+    ).all()
+    by_username = {u.username: u for u in users}
+    patients = {u.id for u in users if u.role == "patient"}
+    exercises = set(db.scalars(select(models.Exercises.id).where(models.Exercises.id.in_(exercise_ids))))
+
+    scores, reps = [], []
+    for session in sessions:
+        user = by_username.get(session["username"])
+        if user is None or session["patient_id"] not in patients or session["exercise_id"] not in exercises:
+            logger.warning("Skipping session %s for patient %s: unknown user, patient or exercise",
+                           session["session_id"], session["patient_id"])
+            continue
+        # Same rule as /scores/add: patients only record their own sessions
+        if user.role != "doctor" and user.id != session["patient_id"]:
+            logger.warning("Skipping session %s for patient %s: %s is not authorised",
+                           session["session_id"], session["patient_id"], user.username)
+            continue
+
+        session_id = session["session_id"]
+        timestamp = int(session["ended"] * 1000)
+        scores.append({
+            "user_id": session["patient_id"],
+            "exercise_id": session["exercise_id"],
+            "score": int(session["good_reps"] / session["total_reps"] * 100),
+            "timestamp": timestamp,
+            "session_id": session_id,
+            "total_reps": session["total_reps"],
+            "good_reps": session["good_reps"],
+            "average_rep_time": session["average_rep_time"],
+        })
+        reps.extend({
+            "session_id": session_id,
+            "user_id": session["patient_id"],
+            "exercise_id": session["exercise_id"],
+            "rep": rep["rep"],
+            "start_frame": rep["start_frame"],
+            "end_frame": rep["end_frame"],
+            "duration": rep["duration"],
+            "min_value": rep["min_value"],
+            "max_value": rep["max_value"],
+            "good": rep["good"],
+            "feedback": rep["feedback"][:100],
+            "timestamp": timestamp,
+        } for rep in session["reps"])
+    return scores, reps
+
+
+def write_sessions(sessions):
+    """
+    Writes a batch of sessions in one transaction with one multi-row insert
+    per table and returns the ids of the sessions written (the others failed
+    the checks). Blocking, runs in the thread pool.
+    """
+    db = SessionLocal()
+    try:
+        scores, reps = score_rows(sessions, db)
+        if scores:
+            db.execute(insert(models.UserExerciseScore), scores)
+            update_rollups(db, scores)
+        if reps:
+            db.execute(insert(models.UserExerciseRep), reps)
+        db.commit()
+        return {score["session_id"] for score in scores}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class ScoreWriter:
+    """
+    Write-behind queue for finished pose sessions.
+
+    `submit()` never waits: sessions go into a bounded queue (dropped with a
+    message when it is full) and one background task drains it in batches,
+    so the websocket never waits on the database and many sessions ending
+    together cost a few round trips instead of a few per session.
+
+    A failed batch is retried, then written one session at a time so a single
+    bad session cannot lose the rest. Every session gets a future that says
+    whether it was persisted, for callers that want to acknowledge it.
+    """
+
+    def __init__(self, max_size=SCORE_QUEUE_SIZE, batch_size=SCORE_BATCH_SIZE, flush_interval=SCORE_FLUSH_INTERVAL,
+                 retries=SCORE_WRITE_RETRIES, retry_delay=SCORE_RETRY_DELAY):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.written = 0
+        self.dropped = 0
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._task = asyncio.create_task(self._run())
+
+    def submit(self, session):
+        """
+        Queues a finished session under a new session_id. Returns a future
+        that resolves to True once it is committed, or False if it was
+        dropped, skipped or could not be written.
+        """
+        session = {**session, "session_id": str(uuid.uuid4())}
+        persisted = asyncio.get_running_loop().create_future()
+        if self._queue is None:
+            logger.warning("Score writer not running, session %s not recorded", session["session_id"])
+            persisted.set_result(False)
+            return persisted
+        try:
+            self._queue.put_nowait((session, persisted))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Score queue full, session %s for patient %s dropped",
+                           session["session_id"], session["patient_id"])
+            persisted.set_result(False)
+        return persisted
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _write(self, sessions):
+        """
+        Returns the ids of the sessions that were written.
+        """
+        ids = [session["session_id"] for session in sessions]
+        for attempt in range(self.retries + 1):
+            try:
+                return await run_in_threadpool(write_sessions, sessions)
+            except Exception:
+                logger.warning("Writing session(s) %s failed (attempt %d of %d)",
+                               ", ".join(ids), attempt + 1, self.retries + 1, exc_info=True)
+            if attempt < self.retries:
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+        if len(sessions) == 1:
+            logger.error("Session %s for patient %s not recorded", ids[0], sessions[0]["patient_id"])
+            return set()
+
+        # Keep whatever can be written
+        written = set()
+        for session in sessions:
+            try:
+                written |= await run_in_threadpool(write_sessions, [session])
+            except Exception:
+                logger.exception("Session %s for patient %s not recorded", session["session_id"], session["patient_id"])
+        return written
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            closing = batch[-1] is None  # stop() was called, everything before it is in this batch
+            entries = [entry for entry in batch if entry is not None]
+            if entries:
+                written = await self._write([session for session, _ in entries])
+                self.written += len(written)
+                for session, persisted in entries:
+                    if not persisted.done():  # The caller may have stopped waiting
+                        persisted.set_result(session["session_id"] in written)
+            if closing:
+                return
+
+    async def stop(self):
+        """
+        Writes whatever is still queued, then stops the background task.
+        """
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._queue = self._task = None
+
+
+score_writer = ScoreWriter()
@@ -1,16 +1,24 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from fastapi.responses import JSONResponse
 from app import schemas, models
 from app.db import get_db
-from app.api.utils import get_current_user
-from sqlalchemy.orm import Session
-
+from app.api.utils import get_current_user, Principal
+from app.api.score_rollups import update_rollups, score_day
+from typing import Optional
+from datetime import timedelta
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, insert
 
 
 router = APIRouter(prefix="/scores")
 
+# Bulk uploads are inserted this many rows per statement and capped at
+# MAX_BULK_SCORES items, so a request costs a bounded number of round trips
+BULK_CHUNK_SIZE = 500
+MAX_BULK_SCORES = 5000
+
 @router.get("/patient/{patient_id}")
-async def get_patient_score(patient_id: int, user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_patient_score(patient_id: int, user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
 
 
     if not patient_id:
@@ -28,6 +36,7 @@ async def get_patient_score(patient_id: int, user: models.User = Depends(get_cur
     
     scores: list[models.UserExerciseScore] = (
         db.query(models.UserExerciseScore)
+            .options(joinedload(models.UserExerciseScore.exercise))  # Titles in the same query, not one per score
             .filter(models.UserExerciseScore.user_id == patient_id)
             .order_by(models.UserExerciseScore.timestamp.desc())
             .limit(7)
@@ -36,8 +45,83 @@ async def get_patient_score(patient_id: int, user: models.User = Depends(get_cur
 
     return [{"timestamp": sc.timestamp, "score": sc.score, "exercise": sc.exercise.title} for sc in scores][::-1]
 
+def period_start(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+@router.get("/patient/{patient_id}/trend")
+async def get_patient_score_trend(
+    patient_id: int,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    exercise_id: Optional[int] = None,
+    user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Score trend from the daily rollups. `start`/`end` are millisecond
+    timestamps (inclusive UTC days), weeks start on Monday.
+    """
+
+    patient: models.User = db.query(models.User).filter(models.User.id == patient_id).first()
+    if not patient or patient.role != "patient":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No patient found with given ID")
+
+    if user.role != "doctor" and user.id != patient.id:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="You are not authorised for this")
+
+    daily = models.UserExerciseDailyScore
+    query = (
+        db.query(daily, models.Exercises.title)
+            .join(models.Exercises, models.Exercises.id == daily.exercise_id)
+            .filter(daily.user_id == patient_id)
+    )
+    if exercise_id is not None:
+        query = query.filter(daily.exercise_id == exercise_id)
+    if start is not None:
+        query = query.filter(daily.day >= score_day(start))
+    if end is not None:
+        query = query.filter(daily.day <= score_day(end))
+
+    # Days are merged into weeks/months here, there are at most a few hundred of them
+    periods = {}
+    for row, title in query.order_by(daily.day):
+        key = (period_start(row.day, granularity), row.exercise_id)
+        period = periods.get(key)
+        if period is None:
+            periods[key] = {
+                "period": key[0].isoformat(),
+                "exercise_id": row.exercise_id,
+                "exercise": title,
+                "count": row.count,
+                "total": row.total,
+                "min": row.min_score,
+                "max": row.max_score,
+                "last": row.last_score,
+                "last_timestamp": row.last_timestamp,
+            }
+            continue
+        period["count"] += row.count
+        period["total"] += row.total
+        period["min"] = min(period["min"], row.min_score)
+        period["max"] = max(period["max"], row.max_score)
+        if row.last_timestamp >= period["last_timestamp"]:
+            period["last"] = row.last_score
+            period["last_timestamp"] = row.last_timestamp
+
+    trend = []
+    for period in periods.values():
+        period["mean"] = round(period.pop("total") / period["count"], 2)
+        trend.append(period)
+    return trend
+
 @router.post("/add")
-async def store_patient_score(request_data: schemas.Add_New_Score, user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def store_patient_score(request_data: schemas.Add_New_Score, user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
 
     patient: models.User = db.query(models.User).filter(models.User.id == request_data.patient_id).first()
     if not patient:
@@ -57,6 +141,12 @@ async def store_patient_score(request_data: schemas.Add_New_Score, user: models.
         )
 
         db.add(new_score)
+        update_rollups(db, [{
+            "user_id": request_data.patient_id,
+            "exercise_id": request_data.exercise_id,
+            "score": request_data.score,
+            "timestamp": request_data.timestamp,
+        }])
         db.commit()
         db.refresh(new_score)
     
@@ -70,3 +160,56 @@ async def store_patient_score(request_data: schemas.Add_New_Score, user: models.
         )
     
     return JSONResponse({"status":"ok"})
+
+
+@router.post("/add/bulk")
+async def store_patient_scores(request_data: schemas.Add_New_Scores, user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+
+    items = request_data.scores
+    if not items:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No scores provided")
+    if len(items) > MAX_BULK_SCORES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_BULK_SCORES} scores per request")
+
+    # One query each for every patient and exercise in the request
+    patients = set(db.scalars(
+        select(models.User.id)
+        .where(models.User.id.in_({item.patient_id for item in items}), models.User.role == "patient")
+    ))
+    exercises = set(db.scalars(
+        select(models.Exercises.id).where(models.Exercises.id.in_({item.exercise_id for item in items}))
+    ))
+
+    results, rows = [], []
+    for index, item in enumerate(items):
+        if item.patient_id not in patients:
+            results.append({"index": index, "status": "error", "detail": "No patient found with given ID"})
+        elif user.role != "doctor" and user.id != item.patient_id:
+            results.append({"index": index, "status": "error", "detail": "You are not authorised for this"})
+        elif item.exercise_id not in exercises:
+            results.append({"index": index, "status": "error", "detail": "No exercise found with given ID"})
+        else:
+            results.append({"index": index, "status": "ok"})
+            rows.append({
+                "user_id": item.patient_id,
+                "exercise_id": item.exercise_id,
+                "score": item.score,
+                "timestamp": item.timestamp,
+            })
+
+    try:
+        for i in range(0, len(rows), BULK_CHUNK_SIZE):
+            db.execute(insert(models.UserExerciseScore), rows[i:i + BULK_CHUNK_SIZE])
+        update_rollups(db, rows)
+        db.commit()
+
+    except Exception as e:
+        db.rollback()
+        #handle exceptions that may occur.
+        print(f"\n\nError in bulk score assignment:\n{str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    return JSONResponse({"status": "ok", "inserted": len(rows), "results": results})
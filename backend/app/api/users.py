@@ -1,25 +1,67 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from fastapi.responses import JSONResponse
 from app import schemas, models
 from app.db import get_db
-from app.api.utils import get_current_user
-from sqlalchemy.orm import Session
+from app.api.utils import get_current_user, get_current_user_record, Principal
+from sqlalchemy.orm import Session, selectinload
+from typing import Optional
+import base64
+import json
 
 
 
 router = APIRouter(prefix="/users")
 
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"after": last_id}).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["after"])
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
 
 
 
 
 @router.get("/patients")
-async def get_patients_list(user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_patients_list(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
+    exercise_id: Optional[int] = None,
+    user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
 
     if user.role != "doctor":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="You are not authorised for this")
 
-    all_user_objects = db.query(models.User).filter(models.User.role == "patient").all()
+    # Keyset pagination on id, served by the (role, id) index: each page is
+    # "the next `limit` patients after the cursor", however deep it is
+    query = (
+        db.query(models.User)
+            .filter(models.User.role == "patient")
+            .options(selectinload(models.User.assignments).selectinload(models.User_Exercises.exercise))
+    )
+    if cursor:
+        query = query.filter(models.User.id > decode_cursor(cursor))
+    if search:
+        # Prefix match so the username index can be used
+        escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.filter(models.User.username.like(f"{escaped}%", escape="\\"))
+    if exercise_id is not None:
+        query = query.filter(models.User.assignments.any(models.User_Exercises.exercise_id == exercise_id))
+
+    # One row more than needed tells whether another page exists
+    all_user_objects = query.order_by(models.User.id).limit(limit + 1).all()
+    has_more = len(all_user_objects) > limit
+    all_user_objects = all_user_objects[:limit]
 
     all_user_list = []
     for patient in all_user_objects:
@@ -39,12 +81,15 @@ async def get_patients_list(user: models.User = Depends(get_current_user), db: S
                 "exercises" : patient_exercises
             })
 
-    return JSONResponse(all_user_list)
+    return JSONResponse({
+            "patients": all_user_list,
+            "next_cursor": encode_cursor(all_user_objects[-1].id) if has_more else None,
+        })
 
 
 
 @router.get("/patients/me")
-async def get_patient_profile(user: models.User = Depends(get_current_user)):
+async def get_patient_profile(user: models.User = Depends(get_current_user_record)):
 
     if user.role != "patient":
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No patient found with given ID")
@@ -69,7 +114,7 @@ async def get_patient_profile(user: models.User = Depends(get_current_user)):
 
 
 @router.put("/patients/me")
-async def update_patient_profile(request_data: schemas.Update_User, user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def update_patient_profile(request_data: schemas.Update_User, user: models.User = Depends(get_current_user_record), db: Session = Depends(get_db)):
 
     try:
         user.age = request_data.age
@@ -84,7 +129,7 @@ async def update_patient_profile(request_data: schemas.Update_User, user: models
 
 
 @router.get("/patients/{patient_id}")
-async def get_patient_by_id(patient_id: int, user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_patient_by_id(patient_id: int, user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
 
     if not patient_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Patient ID not provided")
@@ -120,7 +165,7 @@ async def get_patient_by_id(patient_id: int, user: models.User = Depends(get_cur
 
 
 @router.get("/doctors")
-async def get_doctors_list(user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_doctors_list(user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
 
     if user.role != "doctor":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="You are not authorised for this")
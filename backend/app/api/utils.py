@@ -8,15 +8,53 @@ from sqlalchemy.exc import IntegrityError
 from passlib.context import CryptContext
 import os
 from datetime import datetime, timedelta
+import time
 from typing import Optional
 from jose import jwt
 
 
-async def get_current_user(db: Session = Depends(get_db), access_token: str = Cookie(None)):
+# Decoded tokens are cached for this many seconds (never past their expiry)
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", 60))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 1024))
+
+token_cache = {}  # access_token -> (valid until, Principal)
+
+
+class Principal:
+    """
+    The authenticated user as stated by verified token claims. Has the
+    `id`, `username` and `role` endpoints check, without a database query.
+    """
+
+    def __init__(self, id: int, username: str, role: str):
+        self.id = id
+        self.username = username
+        self.role = role
+
+
+def cache_principal(access_token: str, principal: Principal, expires: Optional[float]):
+    now = time.time()
+    if len(token_cache) >= TOKEN_CACHE_SIZE:
+        # Drop expired entries first, then the oldest ones
+        for token in [t for t, (until, _) in token_cache.items() if until <= now]:
+            del token_cache[token]
+        while len(token_cache) >= TOKEN_CACHE_SIZE:
+            del token_cache[next(iter(token_cache))]
+    until = now + TOKEN_CACHE_TTL
+    if expires is not None:
+        until = min(until, expires)
+    token_cache[access_token] = (until, principal)
+
+
+async def get_current_user(db: Session = Depends(get_db), access_token: str = Cookie(None)) -> Principal:
 
     if not access_token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="No Token Found")
-    
+
+    cached = token_cache.get(access_token)
+    if cached and cached[0] > time.time():
+        return cached[1]
+
     try:
         payload = jwt.decode(access_token, SECRET_KEY, algorithms=[ALGORITHM])
 
@@ -24,13 +62,31 @@ async def get_current_user(db: Session = Depends(get_db), access_token: str = Co
 
         if username is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user = db.query(models.User).filter(models.User.username == username).first()
 
-        return user
+        if payload.get("id") is not None:
+            principal = Principal(payload["id"], username, payload.get("role"))
+        else:
+            # Tokens issued before the id claim was added: look the user up once
+            user = db.query(models.User).filter(models.User.username == username).first()
+            if user is None:
+                raise HTTPException(status_code=401, detail="Invalid token")
+            principal = Principal(user.id, user.username, user.role)
+
+        cache_principal(access_token, principal, payload.get("exp"))
+        return principal
     
     except Exception as e:
         # print("\n\n\n")
         # print(e)
         # print("\n\n\n")
         raise HTTPException(status_code=401, detail=f"Token verification failed.\n\n{str(e)}")
+
+
+async def get_current_user_record(principal: Principal = Depends(get_current_user), db: Session = Depends(get_db)) -> models.User:
+    """
+    Loads the full User row, for the endpoints that need more than the token claims.
+    """
+    user = db.get(models.User, principal.id)
+    if user is None:
+        raise HTTPException(status_code=401, detail="User no longer exists")
+    return user
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, BigInteger
+from sqlalchemy import Column, Integer, String, ForeignKey, BigInteger, Float, Boolean, Index, Date
 from sqlalchemy.orm import relationship
 from app.db import Base
 
@@ -15,6 +15,11 @@ class User(Base):
     assignments = relationship("User_Exercises", back_populates="user")
     exercise_scores = relationship("UserExerciseScore", back_populates="user")
 
+    __table_args__ = (
+        # Patient/doctor listings filter on role and page through ids
+        Index("ix_users_role_id", "role", "id"),
+    )
+
 
 
 class Exercises(Base):
@@ -48,7 +53,54 @@ class UserExerciseScore(Base):
     score = Column(Integer, nullable=False)
     timestamp = Column(BigInteger, nullable=False)  # store in milliseconds
 
+    # Filled in for sessions recorded by the pose websocket
+    session_id = Column(String(36), nullable=True, index=True)
+    total_reps = Column(Integer, nullable=True)
+    good_reps = Column(Integer, nullable=True)
+    average_rep_time = Column(Float, nullable=True)  # seconds
+
     # Optional: add relationships if needed
     user = relationship("User", back_populates="exercise_scores")
     exercise = relationship("Exercises", back_populates="user_scores")
 
+    __table_args__ = (
+        # Serves "latest scores of a patient" without scanning or sorting their history
+        Index("ix_user_exercise_scores_user_id_timestamp", "user_id", "timestamp"),
+    )
+
+
+
+class UserExerciseRep(Base):
+    __tablename__ = 'user_exercise_reps'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(String(36), nullable=False, index=True)  # Same as UserExerciseScore.session_id
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    exercise_id = Column(Integer, ForeignKey("exercises.id"), nullable=False)
+
+    rep = Column(Integer, nullable=False)
+    start_frame = Column(Integer, nullable=True)
+    end_frame = Column(Integer, nullable=True)
+    duration = Column(Float, nullable=False)  # seconds
+    min_value = Column(Float, nullable=True)
+    max_value = Column(Float, nullable=True)
+    good = Column(Boolean, nullable=False)
+    feedback = Column(String(100), nullable=True)
+    timestamp = Column(BigInteger, nullable=False)  # session end, in milliseconds
+
+
+
+class UserExerciseDailyScore(Base):
+    __tablename__ = 'user_exercise_daily_scores'
+
+    # One row per patient, exercise and UTC day, kept up to date on every score insert
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    exercise_id = Column(Integer, ForeignKey("exercises.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    count = Column(Integer, nullable=False)
+    total = Column(BigInteger, nullable=False)  # Sum of scores, mean is total / count
+    min_score = Column(Integer, nullable=False)
+    max_score = Column(Integer, nullable=False)
+    last_score = Column(Integer, nullable=False)
+    last_timestamp = Column(BigInteger, nullable=False)  # milliseconds
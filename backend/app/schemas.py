@@ -28,4 +28,7 @@ class Add_New_Score(BaseModel):
     patient_id: int
     exercise_id: int
     score: int
-    timestamp: int
\ No newline at end of file
+    timestamp: int
+
+class Add_New_Scores(BaseModel):
+    scores: list[Add_New_Score]
@@ -0,0 +1,42 @@
+import os
+import sys
+
+# app.db needs a DATABASE_URL at import; tests swap in their own engine
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app import models
+
+
+@pytest.fixture
+def engine():
+    # One in-memory database shared by every connection and thread
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    # user_exercises is MySQL-only (autoincrement in a composite key), scores do not need it
+    models.Base.metadata.create_all(engine, tables=[
+        models.User.__table__, models.Exercises.__table__, models.UserExerciseScore.__table__,
+        models.UserExerciseRep.__table__, models.UserExerciseDailyScore.__table__,
+    ])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine, autoflush=False)()
+    session.add_all([
+        models.User(id=1, username="patient", password="x", role="patient"),
+        models.User(id=2, username="doctor", password="x", role="doctor"),
+    ])
+    session.add_all([models.Exercises(id=i, title=f"exercise {i}") for i in range(1, 8)])
+    session.add_all([
+        models.UserExerciseScore(user_id=1, exercise_id=i % 7 + 1, score=i, timestamp=1_700_000_000_000 + i)
+        for i in range(50)
+    ])
+    session.commit()
+    yield session
+    session.close()
@@ -0,0 +1,57 @@
+from datetime import date
+from sqlalchemy import select
+from app import models
+from app.api import score_rollups
+from app.api.score_rollups import aggregate_rows, backfill, update_rollups
+
+DAY = 1_706_529_600_000  # 2024-01-29 12:00 UTC
+
+
+def rollups(db):
+    daily = models.UserExerciseDailyScore
+    return {
+        (row.user_id, row.exercise_id, row.day): row
+        for row in db.scalars(select(daily).execution_options(populate_existing=True))
+    }
+
+
+def test_update_rollups_merges_into_existing_day(db):
+    update_rollups(db, [
+        {"user_id": 1, "exercise_id": 1, "score": 60, "timestamp": DAY},
+        {"user_id": 1, "exercise_id": 1, "score": 80, "timestamp": DAY + 1000},
+    ])
+    db.commit()
+    # A late write with an older timestamp must not replace the last score
+    update_rollups(db, [
+        {"user_id": 1, "exercise_id": 1, "score": 40, "timestamp": DAY - 1000},
+        {"user_id": 1, "exercise_id": 2, "score": 90, "timestamp": DAY},
+    ])
+    db.commit()
+
+    rows = rollups(db)
+    merged = rows[(1, 1, date(2024, 1, 29))]
+    assert (merged.count, merged.total, merged.min_score, merged.max_score) == (3, 180, 40, 80)
+    assert (merged.last_score, merged.last_timestamp) == (80, DAY + 1000)
+    assert rows[(1, 2, date(2024, 1, 29))].count == 1
+
+
+def test_backfill_matches_raw_scores(db, monkeypatch):
+    monkeypatch.setattr(score_rollups, "BACKFILL_CHUNK_SIZE", 7)  # Several keyset pages
+    # Stale rollup that the rebuild replaces
+    update_rollups(db, [{"user_id": 1, "exercise_id": 1, "score": 5, "timestamp": DAY}])
+    db.commit()
+
+    assert backfill(db, patient_id=1) == 50
+
+    scores = db.execute(
+        select(models.UserExerciseScore.user_id, models.UserExerciseScore.exercise_id,
+               models.UserExerciseScore.score, models.UserExerciseScore.timestamp)
+    ).mappings().all()
+    expected = {(r["user_id"], r["exercise_id"], r["day"]): r for r in aggregate_rows(scores)}
+    rows = rollups(db)
+    assert rows.keys() == expected.keys()
+    for key, row in rows.items():
+        assert (row.count, row.total, row.min_score, row.max_score, row.last_score) == (
+            expected[key]["count"], expected[key]["total"], expected[key]["min_score"],
+            expected[key]["max_score"], expected[key]["last_score"],
+        )
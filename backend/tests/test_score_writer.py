@@ -0,0 +1,67 @@
+import re
+import asyncio
+import logging
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.api import score_writer
+from app.api.score_writer import ScoreWriter
+
+
+@pytest.fixture(autouse=True)
+def writer_db(engine, db, monkeypatch):
+    # The writer opens its own sessions; point them at the test database
+    monkeypatch.setattr(score_writer, "SessionLocal", sessionmaker(bind=engine, autoflush=False))
+
+
+def session(good_reps=3, feedback="Good rep"):
+    return {
+        "username": "patient", "patient_id": 1, "exercise_id": 1,
+        "started": 1_706_529_600.0, "ended": 1_706_529_630.0,
+        "total_reps": 4, "good_reps": good_reps, "average_rep_time": 2.5,
+        "reps": [{
+            "rep": i + 1, "start_frame": i * 10, "end_frame": i * 10 + 9, "duration": 2.5,
+            "min_value": 40.0, "max_value": 170.0, "good": True, "feedback": feedback,
+        } for i in range(4)],
+    }
+
+
+def run_writer(sessions, **kwargs):
+    async def main():
+        writer = ScoreWriter(retry_delay=0, **kwargs)
+        writer.start()
+        futures = [writer.submit(s) for s in sessions]
+        await writer.stop()
+        return writer, [f.result() for f in futures]
+    return asyncio.run(main())
+
+
+def test_batch_is_written_and_acknowledged(db):
+    writer, persisted = run_writer([session(good_reps=i) for i in range(3)])
+
+    assert persisted == [True, True, True]
+    assert writer.written == 3
+    assert db.query(models.UserExerciseRep).count() == 12
+    daily = db.query(models.UserExerciseDailyScore).one()
+    assert (daily.count, daily.min_score, daily.max_score) == (3, 0, 50)
+
+
+def test_failed_batch_falls_back_to_single_sessions(db, caplog):
+    sessions = [session(), session(feedback=None), session()]  # The middle one cannot be written
+
+    with caplog.at_level(logging.WARNING, logger=score_writer.__name__):
+        writer, persisted = run_writer(sessions, retries=1)
+
+    assert persisted == [True, False, True]
+    assert writer.written == 2
+    assert db.query(models.UserExerciseScore).filter(models.UserExerciseScore.session_id.isnot(None)).count() == 2
+    # Two batch attempts, then the bad session on its own, each logged with the ids
+    failed = [r for r in caplog.records if "not recorded" in r.getMessage() or "failed" in r.getMessage()]
+    assert len(failed) == 3
+    assert all(re.search(r"[0-9a-f]{8}-[0-9a-f]{4}-", r.getMessage()) for r in failed)
+
+
+def test_skipped_session_is_not_acknowledged():
+    _, persisted = run_writer([{**session(), "username": "nobody"}])
+
+    assert persisted == [False]
@@ -0,0 +1,113 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app import models
+from app.db import get_db
+from app.api import scores
+from app.api.utils import get_current_user, Principal
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(scores.router, prefix="/api")
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: Principal(2, "doctor", "doctor")
+    return TestClient(app)
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_score_history_is_two_queries(client, db, engine):
+    db.expunge_all()  # Nothing cached from the fixture's inserts
+    statements = count_statements(engine)
+
+    response = client.get("/api/scores/patient/1")
+
+    assert response.status_code == 200
+    history = response.json()
+    assert [row["score"] for row in history] == list(range(43, 50))
+    assert history[-1]["exercise"] == f"exercise {49 % 7 + 1}"
+    # Patient lookup, then scores joined to their exercises (no query per score)
+    assert len(statements) == 2
+
+
+def post_trend_scores(client):
+    # Mon 29 Jan, Wed 31 Jan, Thu 1 Feb, Mon 5 Feb 2024, 12:00 UTC
+    days = [1_706_529_600_000 + d * 86_400_000 for d in (0, 2, 3, 7)]
+    response = client.post("/api/scores/add", json={"patient_id": 1, "exercise_id": 1, "score": 50, "timestamp": days[0]})
+    assert response.status_code == 200
+    response = client.post("/api/scores/add/bulk", json={"scores": [
+        {"patient_id": 1, "exercise_id": 1, "score": score, "timestamp": day}
+        for score, day in zip((70, 90, 40), days[1:])
+    ]})
+    assert response.status_code == 200
+    return days
+
+
+def test_trend_by_week(client):
+    days = post_trend_scores(client)
+
+    response = client.get("/api/scores/patient/1/trend", params={"granularity": "week", "start": days[0]})
+
+    assert response.status_code == 200
+    assert [(p["period"], p["count"], p["min"], p["max"], p["last"], p["mean"]) for p in response.json()] == [
+        ("2024-01-29", 3, 50, 90, 90, 70.0),
+        ("2024-02-05", 1, 40, 40, 40, 40.0),
+    ]
+
+
+def test_trend_by_month(client):
+    days = post_trend_scores(client)
+
+    response = client.get("/api/scores/patient/1/trend", params={"granularity": "month", "start": days[0], "exercise_id": 1})
+
+    assert response.status_code == 200
+    trend = response.json()
+    assert [(p["period"], p["count"], p["mean"], p["last_timestamp"]) for p in trend] == [
+        ("2024-01-01", 2, 60.0, days[1]),
+        ("2024-02-01", 2, 65.0, days[3]),
+    ]
+    assert trend[0]["exercise"] == "exercise 1"
+
+
+def bulk_item(i, patient_id=1, exercise_id=1):
+    return {"patient_id": patient_id, "exercise_id": exercise_id, "score": i % 100, "timestamp": 1_706_529_600_000 + i}
+
+
+def test_bulk_rejects_more_than_max_scores(client, db):
+    response = client.post("/api/scores/add/bulk", json={"scores": [bulk_item(i) for i in range(scores.MAX_BULK_SCORES + 1)]})
+
+    assert response.status_code == 400
+    assert db.query(models.UserExerciseScore).count() == 50  # Only the fixture's scores
+
+
+def test_bulk_inserts_in_chunks(client, engine):
+    statements = count_statements(engine)
+
+    response = client.post("/api/scores/add/bulk", json={"scores": [bulk_item(i) for i in range(1201)]})
+
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 1201
+    inserts = [s for s in statements if s.startswith("INSERT INTO user_exercise_scores")]
+    assert len(inserts) == 3  # 500 + 500 + 201 rows
+
+
+def test_bulk_reports_invalid_items_and_inserts_the_rest(client, db):
+    items = [bulk_item(i) for i in range(600)]
+    items[10] = bulk_item(10, patient_id=2)  # The doctor, not a patient
+    items[550] = bulk_item(550, exercise_id=99)  # In the second chunk
+
+    response = client.post("/api/scores/add/bulk", json={"scores": items})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["inserted"] == 598
+    errors = {r["index"]: r["detail"] for r in body["results"] if r["status"] == "error"}
+    assert errors == {10: "No patient found with given ID", 550: "No exercise found with given ID"}
+    assert db.query(models.UserExerciseScore).filter(models.UserExerciseScore.timestamp >= 1_706_529_600_000).count() == 598
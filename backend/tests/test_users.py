@@ -0,0 +1,86 @@
+import base64
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from app import models
+from app.db import get_db
+from app.api import users
+from app.api.utils import get_current_user, Principal
+
+USERNAMES = ["al_ice", "alxice", "100%fit", "100 fit", "back\\slash"]
+
+
+@pytest.fixture
+def client(db):
+    # Created by hand: the model's autoincrement id in a composite key is MySQL-only
+    db.execute(text("CREATE TABLE user_exercises (id INTEGER, user_id INTEGER, exercise_id INTEGER, PRIMARY KEY (id, user_id, exercise_id))"))
+    db.add_all([models.User(id=10 + i, username=f"patient{i:02d}", password="x", role="patient") for i in range(25)])
+    db.add_all([models.User(id=100 + i, username=name, password="x", role="patient") for i, name in enumerate(USERNAMES)])
+    db.add_all([models.User_Exercises(id=i, user_id=10 + i, exercise_id=3) for i in range(0, 25, 5)])
+    db.commit()
+
+    app = FastAPI()
+    app.include_router(users.router, prefix="/api")
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: Principal(2, "doctor", "doctor")
+    return TestClient(app)
+
+
+def patients(client, **params):
+    response = client.get("/api/users/patients", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_cursor_pages_through_every_patient(client):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = patients(client, limit=10, **({"cursor": cursor} if cursor else {}))
+        ids.extend(patient["id"] for patient in page["patients"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+        assert json.loads(base64.urlsafe_b64decode(cursor)) == {"after": ids[-1]}
+
+    assert ids == [1] + list(range(10, 35)) + list(range(100, 105))
+    assert pages == 4
+
+
+def test_limit_is_bounded(client):
+    assert len(patients(client, limit=200)["patients"]) == 31
+    assert client.get("/api/users/patients", params={"limit": 201}).status_code == 422
+    assert client.get("/api/users/patients", params={"limit": 0}).status_code == 422
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    base64.urlsafe_b64encode(b'{"before": 3}').decode(),
+    base64.urlsafe_b64encode(b'{"after": "x"}').decode(),
+])
+def test_malformed_cursor_is_a_bad_request(client, cursor):
+    response = client.get("/api/users/patients", params={"cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.parametrize("search, expected", [
+    ("al_", ["al_ice"]),
+    ("al", ["al_ice", "alxice"]),
+    ("100%", ["100%fit"]),
+    ("back\\", ["back\\slash"]),
+    ("%", []),
+])
+def test_search_is_an_escaped_prefix(client, search, expected):
+    assert [p["username"] for p in patients(client, search=search)["patients"]] == expected
+
+
+def test_exercise_filter_and_assignments(client):
+    page = patients(client, exercise_id=3)
+
+    assert [p["id"] for p in page["patients"]] == [10, 15, 20, 25, 30]
+    assert page["patients"][0]["exercises"] == [{"id": 3, "title": "exercise 3"}]
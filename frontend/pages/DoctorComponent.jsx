@@ -3,9 +3,13 @@ import { CheckCircle, Clock, User } from "lucide-react";
 import { useEffect, useState } from "react";
 import ScoreLineChart from "./GraphComponent";
 const isDev = import.meta.env.MODE == "development";
+// Days of score history shown in the trend graphs
+const TREND_DAYS = 30;
 
 export default function DoctorComponent() {
   const [patients, setPatients] = useState([]);
+  // Cursor for the next page of patients, null once all are loaded
+  const [nextCursor, setNextCursor] = useState(null);
   const [exercises, setExercises] = useState([]);
   const [open, setOpen] = useState(false);
   const [currPatient, setCurrPatient] = useState(null);
@@ -19,15 +23,19 @@ export default function DoctorComponent() {
     title: "",
   });
 
-  async function getPatients() {
+  async function getPatients(cursor = null) {
     await axios
       .get(`${isDev ? "http://localhost:8000" : ""}/api/users/patients`, {
+        params: cursor ? { cursor } : {},
         withCredentials: true,
       })
       .then((res) => {
         console.log("Doctor Dashboard:\n");
         console.log(res.data);
-        setPatients(res.data);
+        setPatients((prev) =>
+          cursor ? [...prev, ...res.data.patients] : res.data.patients
+        );
+        setNextCursor(res.data.next_cursor);
       })
       .catch((error) => {
         console.log("Doctor Dashboard:\n");
@@ -242,6 +250,14 @@ export default function DoctorComponent() {
           </div>
         ))}
       </div>
+      {nextCursor && (
+        <button
+          className="mt-6 bg-cyan-500 rounded-md text-white px-4 py-2"
+          onClick={() => getPatients(nextCursor)}
+        >
+          Load more patients
+        </button>
+      )}
     </>
   );
 }
@@ -265,31 +281,28 @@ function PatientScoreGraph({ patient_id, setShowPatientId }) {
       "Dec",
     ];
 
+    // Daily averages from the server-side rollups, last TREND_DAYS days
+    const start = new Date().getTime() - TREND_DAYS * 24 * 60 * 60 * 1000;
+
     await axios
       .get(
-        `${
-          isDev ? "http://localhost:8000" : ""
-        }/api/scores/patient/${patient_id}`,
+        `${isDev ? "http://localhost:8000" : ""}/api/scores/patient/${patient_id}/trend`,
         {
+          params: { start, granularity: "day" },
           withCredentials: true,
         }
       )
       .then((res) => {
         console.log("Get Scores Doctor Dashboard:\n");
         console.log(res.data);
-        let tempScores = res.data;
-        tempScores.forEach((__, i) => {
-          const dateObj = new Date(__.timestamp);
-
-          const date = dateObj.getDate(); // day of the month (1-31)
-          const hours = dateObj.getHours();
-          const minutes = dateObj.getMinutes().toString().padStart(2, "0");
-
-          const formatted = `${date} ${
-            monthNames[dateObj.getMonth()]
-          }: ${hours}:${minutes}`;
+        const tempScores = res.data.map((__) => {
+          // period is a UTC day, e.g. "2025-10-09"
+          const dateObj = new Date(__.period);
+          const formatted = `${dateObj.getUTCDate()} ${
+            monthNames[dateObj.getUTCMonth()]
+          }, ${__.exercise}`;
 
-          __.timestamp = formatted;
+          return { timestamp: formatted, score: __.mean, sessions: __.count };
         });
         setScores(tempScores);
       })
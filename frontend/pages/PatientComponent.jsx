@@ -21,6 +21,8 @@ import axios from "axios";
 import ScoreLineChart from "./GraphComponent";
 import Webcam from "react-webcam";
 const isDev = import.meta.env.MODE == "development";
+// Days of score history shown in the trend graphs
+const TREND_DAYS = 30;
 
 export default function PatientComponent({
   selectedExercise,
@@ -89,31 +91,28 @@ export default function PatientComponent({
       "Dec",
     ];
 
+    // Daily averages from the server-side rollups, last TREND_DAYS days
+    const start = new Date().getTime() - TREND_DAYS * 24 * 60 * 60 * 1000;
+
     await axios
       .get(
-        `${isDev ? "http://localhost:8000" : ""}/api/scores/patient/${
-          patient.id
-        }`,
+        `${isDev ? "http://localhost:8000" : ""}/api/scores/patient/${patient.id}/trend`,
         {
+          params: { start, granularity: "day" },
           withCredentials: true,
         }
       )
       .then((res) => {
         console.log("Get Scores:\n");
         console.log(res.data);
-        let tempScores = res.data;
-        tempScores.forEach((__, i) => {
-          const dateObj = new Date(__.timestamp);
-
-          const date = dateObj.getDate(); // day of the month (1-31)
-          const hours = dateObj.getHours();
-          const minutes = dateObj.getMinutes().toString().padStart(2, "0");
-
-          const formatted = `${date} ${
-            monthNames[dateObj.getMonth()]
-          }: ${hours}:${minutes}, ${__.exercise}`;
-
-          __.timestamp = formatted;
+        const tempScores = res.data.map((__) => {
+          // period is a UTC day, e.g. "2025-10-09"
+          const dateObj = new Date(__.period);
+          const formatted = `${dateObj.getUTCDate()} ${
+            monthNames[dateObj.getUTCMonth()]
+          }, ${__.exercise}`;
+
+          return { timestamp: formatted, score: __.mean, sessions: __.count };
         });
         setScores(tempScores);
       })
@@ -280,7 +279,13 @@ export default function PatientComponent({
 
 function PatientExercise({ exercise, setExercise, patient }) {
   const [score, setScore] = useState();
+  // Whether the server confirmed it stored the session itself
+  const [recorded, setRecorded] = useState(false);
+  // Error sent by the server, e.g. an unknown exercise
+  const [error, setError] = useState(null);
   const [ws, setWs] = useState(null);
+  // Capture rate and frame size, updated by the server's control messages
+  const [capture, setCapture] = useState({ fps: 10, maxSize: null });
   const imgRef = useRef(null);
   const displayRef = useRef(null);
 
@@ -321,9 +326,36 @@ function PatientExercise({ exercise, setExercise, patient }) {
     setWs(socket);
 
     socket.onmessage = (event) => {
-      if (typeof event.data === "string" && event.data.startsWith("SCORE:")) {
-        const finalScore = parseFloat(event.data.replace("SCORE:", ""));
-        setScore(finalScore);
+      if (typeof event.data === "string") {
+        if (!event.data.startsWith("{")) {
+          console.log(event.data);
+          if (event.data.startsWith("ERROR:")) {
+            setError(event.data.slice("ERROR:".length).trim());
+          }
+          return;
+        }
+        const message = JSON.parse(event.data);
+        if (message.type === "control") {
+          // Server recommends how fast and how large to send frames
+          setCapture({ fps: message.fps, maxSize: message.max_size });
+          return;
+        }
+        // Session summary: score is the share of good reps
+        const summary = message;
+        if (summary.status === "session_ended") {
+          if (summary.fallback) {
+            // Scored with a stand-in exercise, so the score is not saved
+            setError(
+              `${exercise.title} is not supported yet, this session was not saved`
+            );
+            return;
+          }
+          const finalScore = summary.total_reps
+            ? (summary.good_reps / summary.total_reps) * 100
+            : 0;
+          setRecorded(Boolean(summary.recorded));
+          setScore(finalScore);
+        }
       } else {
         const blob = new Blob([event.data], { type: "image/jpeg" });
         const url = URL.createObjectURL(blob);
@@ -336,6 +368,7 @@ function PatientExercise({ exercise, setExercise, patient }) {
       socket.send(
         JSON.stringify({
           exercise_id: exercise.id,
+          exercise_type: exercise.title,
           patient_id: patient.id,
           timestamp: new Date().getTime(),
         })
@@ -349,7 +382,14 @@ function PatientExercise({ exercise, setExercise, patient }) {
     const interval = setInterval(() => {
       if (!ws || ws.readyState !== WebSocket.OPEN) return;
 
-      const imageSrc = imgRef.current.getScreenshot(); // base64 JPEG
+      // Scale the screenshot down to the size the server asked for
+      const scale = capture.maxSize
+        ? Math.min(1, capture.maxSize / Math.max(camDim.width, camDim.height))
+        : 1;
+      const imageSrc = imgRef.current.getScreenshot({
+        width: Math.round(camDim.width * scale),
+        height: Math.round(camDim.height * scale),
+      }); // base64 JPEG
 
       if (imageSrc) {
         // Convert base64 to binary and send over WebSocket
@@ -358,10 +398,10 @@ function PatientExercise({ exercise, setExercise, patient }) {
           .then((blob) => blob.arrayBuffer())
           .then((buffer) => ws.send(buffer));
       }
-    }, 100); // ~10 FPS
+    }, 1000 / capture.fps);
 
     return () => clearInterval(interval);
-  }, [ws]);
+  }, [ws, capture]);
 
   useEffect(() => {
     if (!score) {
@@ -369,6 +409,12 @@ function PatientExercise({ exercise, setExercise, patient }) {
       return;
     }
 
+    // The server records the session and its reps itself and says so in the
+    // final message; the score is only posted here when it could not
+    if (recorded) {
+      window.location.reload();
+      return;
+    }
     assignScore();
   }, [score]);
 
@@ -406,6 +452,12 @@ function PatientExercise({ exercise, setExercise, patient }) {
               opacity: 0,
             }}
           />
+          {/* Error Display */}
+          {error && (
+            <div className="text-white bg-red-500 px-4 py-2 my-4 rounded-sm w-[50%] text-xl text-center">
+              {error}
+            </div>
+          )}
           {/* Score Display */}
           {score && (
             <div className="text-white bg-green-500 px-4 py-2 my-4 rounded-sm w-[50%] text-2xl text-center">
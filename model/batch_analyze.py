@@ -0,0 +1,205 @@
+import os
+import re
+import csv
+import hashlib
+import argparse
+import time
+import cv2
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from joint_angles import landmarks_to_array
+from exercise_registry import get_exercise, EXERCISES
+from pose_pool import create_pose
+from session_recorder import SessionRecorder
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+
+# Min/max of the rep's metric go in the columns of its kind (joint angle in
+# degrees, or horizontal offset as a fraction of the frame), the others stay empty
+REP_COLUMNS = [
+    "video", "exercise", "rep", "start_frame", "end_frame",
+    "min_angle", "max_angle", "min_offset", "max_offset", "duration", "verdict", "feedback",
+]
+
+# One Pose instance per worker process, created by the pool initializer
+_pose = None
+
+
+def _init_worker():
+    global _pose
+    _pose = create_pose()
+
+
+def input_root(input_path):
+    """
+    Directory that video paths are relative to: the input directory, or the manifest's.
+    """
+    if os.path.isdir(input_path):
+        return input_path
+    return os.path.dirname(os.path.abspath(input_path))
+
+
+def find_jobs(input_path, default_exercise):
+    """
+    Returns (video path, exercise, patient id) triples from a directory of
+    videos or a CSV manifest with a `path` column and optional `exercise`
+    and `patient_id` columns.
+    """
+    if os.path.isdir(input_path):
+        if not default_exercise:
+            raise ValueError("--exercise is required when analysing a directory")
+        return [
+            (os.path.join(input_path, name), default_exercise, None)
+            for name in sorted(os.listdir(input_path))
+            if name.lower().endswith(VIDEO_EXTENSIONS)
+        ]
+
+    base_dir = input_root(input_path)
+    jobs = []
+    with open(input_path, newline="") as f:
+        for row in csv.DictReader(f):
+            exercise = row.get("exercise") or default_exercise
+            if not exercise:
+                raise ValueError(f"No exercise given for {row['path']}")
+            jobs.append((os.path.join(base_dir, row["path"]), exercise, row.get("patient_id") or None))
+    return jobs
+
+
+def recording_id(path, root):
+    """
+    Session id for a video's recording, from its path relative to `root`:
+    a file-name-safe slug plus a short hash of the path, so videos with the
+    same name in different directories get different recordings.
+    """
+    relative = os.path.relpath(path, root)
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", os.path.splitext(relative)[0]).strip("_") or "video"
+    return f"{slug}_{hashlib.sha1(relative.encode()).hexdigest()[:8]}"
+
+
+def analyze_video(path, exercise_type, patient_id=None, record_dir=None, session_id=None):
+    """
+    Runs one recorded session through Pose and the rep state machine.
+    Returns (per-rep rows, frames processed). Runs inside a worker process.
+    With `record_dir` the landmark time series is also saved there, under
+    `session_id` (see `recording_id`).
+    """
+    exercise = get_exercise(exercise_type)
+    reps = exercise.create_machine()
+    recorder = None
+    if record_dir:
+        recorder = SessionRecorder(patient_id or "offline", exercise.exercise_id, root=record_dir,
+                                   session_id=session_id, metadata={"video": path})
+    _pose.reset()  # Do not carry tracking state over from the previous video
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video '{path}'")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    frames = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        results = _pose.process(image)
+        # Video time, not wall time, so durations do not depend on machine speed
+        landmarks = landmarks_to_array(results.pose_landmarks)
+        reps.step(landmarks, frames / fps)
+        if recorder is not None:
+            recorder.append(landmarks, frames / fps, reps)
+        frames += 1
+    cap.release()
+    if recorder is not None:
+        recorder.save(reps.summary())
+
+    kind = "angle" if exercise.offset_points is None else "offset"
+    rows = [
+        {
+            "video": path,
+            "exercise": exercise.exercise_id,
+            "rep": rep["rep"],
+            "start_frame": rep["start_frame"],
+            "end_frame": rep["end_frame"],
+            f"min_{kind}": round(rep["min_value"], 3),
+            f"max_{kind}": round(rep["max_value"], 3),
+            "duration": round(rep["duration"], 3),
+            "verdict": "good" if rep["good"] else "bad",
+            "feedback": rep["feedback"],
+        }
+        for rep in reps.rep_log
+    ]
+    return rows, frames
+
+
+def write_rows(rows, output_path):
+    """
+    Writes per-rep rows to CSV, or to Parquet when the path ends in .parquet.
+    """
+    if output_path.endswith(".parquet"):
+        import pandas as pd  # Only needed for Parquet output
+        pd.DataFrame(rows, columns=REP_COLUMNS).to_parquet(output_path, index=False)
+        return
+
+    with open(output_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=REP_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(input_path, output_path, default_exercise=None, workers=None, record_dir=None):
+    jobs = find_jobs(input_path, default_exercise)
+    root = input_root(input_path)
+    if not jobs:
+        print(f"No videos found in '{input_path}'")
+        return
+
+    workers = workers or os.cpu_count() or 1
+    print(f"Analysing {len(jobs)} video(s) with {workers} worker(s)...")
+
+    all_rows = []
+    failed = 0
+    total_frames = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = {
+            executor.submit(analyze_video, path, exercise, patient_id, record_dir, recording_id(path, root)): path
+            for path, exercise, patient_id in jobs
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                rows, frames = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{done}/{len(jobs)}] FAILED {path}: {e}")
+                continue
+            all_rows.extend(rows)
+            total_frames += frames
+            good = sum(row["verdict"] == "good" for row in rows)
+            print(f"[{done}/{len(jobs)}] {path}: {len(rows)} reps ({good} good), {frames} frames")
+
+    # Stable output order regardless of completion order
+    all_rows.sort(key=lambda row: (row["video"], row["rep"]))
+    write_rows(all_rows, output_path)
+
+    elapsed = time.perf_counter() - start
+    print("----------------------------------")
+    print(f"Wrote {len(all_rows)} reps to {output_path}")
+    print(f"Videos: {len(jobs) - failed} ok, {failed} failed")
+    print(f"Frames: {total_frames} in {elapsed:.1f}s ({total_frames / elapsed if elapsed else 0:.1f} fps)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch exercise analysis of recorded sessions")
+    parser.add_argument("--input", type=str, required=True,
+                        help='Directory of videos, or CSV manifest with "path" and optional "exercise" columns')
+    parser.add_argument("--output", type=str, required=True,
+                        help="Per-rep results file (.csv or .parquet)")
+    parser.add_argument("--exercise", type=str, default=None,
+                        help=f'Exercise for videos without one in the manifest ({", ".join(EXERCISES)})')
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (defaults to the CPU count)")
+    parser.add_argument("--record", type=str, default=None,
+                        help="Also save each video's landmark time series under this directory")
+    args = parser.parse_args()
+    main(args.input, args.output, args.exercise, args.workers, args.record)
@@ -0,0 +1,377 @@
+"""
+Per-stage benchmark of a pose session.
+
+Times every step a frame goes through on the server - JPEG decode, color
+conversion, pose.process, angles and the rep state machine, overlay drawing
+and imencode - plus a full websocket round trip against /pose/ws/analyze
+served from this process. Input is either synthetic frames with a synthetic
+landmark stream, or a recorded clip (--video). Results are printed as JSON
+so runs can be diffed between versions, e.g.
+
+    python benchmark.py --frames 300 --output bench.json
+    python benchmark.py --video clips/curl.mp4 --exercise curl
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import threading
+import contextlib
+import cv2
+import numpy as np
+import mediapipe as mp
+from types import SimpleNamespace
+from joint_angles import landmarks_to_array, LANDMARK_INDEX, NUM_LANDMARKS
+from exercise_registry import get_exercise, EXERCISES
+from pose_pool import create_warm_pose
+from pose_router import draw_status
+from frame_decode import decode_jpeg, jpeg_size, TARGET_SIZE
+from frame_arena import FrameArena
+from landmark_predictor import LandmarkPredictor, to_pose_landmarks
+from pose_roi import PoseROI
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ("decode", "color", "pose", "state_machine", "draw", "encode")
+
+
+def latency_stats(samples):
+    """
+    Summarises per-frame durations in seconds as milliseconds.
+    """
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    if not len(ms):
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": int(len(ms)),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+    }
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# --- Inputs ---
+
+def synthetic_landmarks(n, fps=30, period=2.0, seed=0):
+    """
+    Returns an (n, 33, 4) landmark stream of a standing person curling the
+    left arm: the elbow angle swings between 40 and 170 degrees every `period` seconds.
+    """
+    rng = np.random.default_rng(seed)
+    base = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+    base[:, 0] = rng.uniform(0.35, 0.65, NUM_LANDMARKS)
+    base[:, 1] = np.linspace(0.1, 0.95, NUM_LANDMARKS)
+    base[:, 2] = rng.uniform(-0.2, 0.2, NUM_LANDMARKS)
+    base[:, 3] = 0.99
+    base[LANDMARK_INDEX["LEFT_SHOULDER"], :3] = (0.6, 0.3, 0.0)
+    base[LANDMARK_INDEX["LEFT_ELBOW"], :3] = (0.6, 0.5, 0.0)
+    base[LANDMARK_INDEX["LEFT_WRIST"], 2] = 0.0  # Arm moves in the image plane
+
+    stream = np.repeat(base[None], n, axis=0)
+    stream[..., :3] += rng.normal(0, 0.002, (n, NUM_LANDMARKS, 3)).astype(np.float32)
+
+    theta = np.radians(105 + 65 * np.cos(2 * np.pi * np.arange(n) / (fps * period)))
+    elbow = stream[:, LANDMARK_INDEX["LEFT_ELBOW"], :2]
+    stream[:, LANDMARK_INDEX["LEFT_WRIST"], 0] = elbow[:, 0] + 0.2 * np.sin(theta)
+    stream[:, LANDMARK_INDEX["LEFT_WRIST"], 1] = elbow[:, 1] - 0.2 * np.cos(theta)
+    return stream
+
+
+def synthetic_frames(n, width=640, height=480, seed=0, quality=80):
+    """
+    Returns `n` JPEG-encoded noisy gradient frames, like a webcam stream.
+    """
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    frames = []
+    for i in range(n):
+        image = np.clip(gradient + rng.normal(0, 20, (height, width, 3)) + i % 32, 0, 255).astype(np.uint8)
+        frames.append(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes())
+    return frames
+
+
+def recorded_frames(path, n, quality=80):
+    """
+    Returns up to `n` frames of a recorded clip, JPEG-encoded like the browser sends them.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video '{path}'")
+    frames = []
+    while len(frames) < n:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes())
+    cap.release()
+    return frames
+
+
+# --- Benchmarks ---
+
+def bench_pipeline(jpegs, stream, exercise, target_size=TARGET_SIZE, roi=None, warmup=5):
+    """
+    Runs every frame through the server-side stages and times each one.
+    Frames where nobody is detected (e.g. synthetic input) use the synthetic
+    landmark stream for the state machine and drawing, so those stages
+    still do representative work. With a PoseROI, color conversion and
+    pose.process run on the person crop, placed from those landmarks.
+    """
+    pose = create_warm_pose()
+    reps = exercise.create_machine()
+    arena = FrameArena()
+    timings = {stage: [] for stage in STAGES}
+    totals = []
+    crop_fractions = []
+    detected = 0
+
+    for i, frame_bytes in enumerate(jpegs):
+        t0 = time.perf_counter()
+        frame = arena.count(decode_jpeg(frame_bytes, target_size))
+        arena.frames += 1
+        t1 = time.perf_counter()
+        view, box = roi.crop(frame) if roi is not None else (frame, None)
+        frame_rgb = cv2.cvtColor(view, cv2.COLOR_BGR2RGB, dst=arena.buffer("rgb", view.shape))
+        t2 = time.perf_counter()
+        results = pose.process(frame_rgb)
+        t3 = time.perf_counter()
+
+        if results.pose_landmarks:
+            detected += 1
+            landmarks = PoseROI.to_full_frame(landmarks_to_array(results.pose_landmarks), box, frame.shape)
+        else:
+            landmarks = stream[i % len(stream)]
+        results = SimpleNamespace(pose_landmarks=to_pose_landmarks(landmarks))
+        if roi is not None:
+            roi.update(landmarks, frame.shape)
+            if i >= warmup:
+                crop_fractions.append(view.shape[0] * view.shape[1] / (frame.shape[0] * frame.shape[1]))
+
+        t4 = time.perf_counter()  # Building the stand-in landmarks is not timed
+        reps.step(landmarks_to_array(results.pose_landmarks), i / 30)
+        t5 = time.perf_counter()
+        draw_status(frame, results, reps.reps, reps.stage, reps.feedback)
+        t6 = time.perf_counter()
+        arena.count(cv2.imencode(".jpg", frame)[1])
+        t7 = time.perf_counter()
+
+        if i < warmup:
+            continue
+        for stage, duration in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t5 - t4, t6 - t5, t7 - t6)):
+            timings[stage].append(duration)
+        totals.append((t3 - t0) + (t7 - t4))
+
+    pose.close()
+    total = float(np.sum(totals))
+    return {
+        "frames": len(totals),
+        "frames_with_detection": detected,
+        "fps": round(len(totals) / total, 1) if total else None,
+        "frame": latency_stats(totals),
+        "stages": {stage: latency_stats(samples) for stage, samples in timings.items()},
+        "buffers": arena.stats(),
+        "mean_crop_fraction": round(float(np.mean(crop_fractions)), 3) if crop_fractions else None,
+    }
+
+
+def bench_state_machine(stream, exercise, repeat=5):
+    """
+    Times angles plus the rep state machine alone over the synthetic stream.
+    """
+    samples = []
+    total_reps = 0
+    for _ in range(repeat):
+        reps = exercise.create_machine()
+        for i, landmarks in enumerate(stream):
+            t0 = time.perf_counter()
+            reps.step(landmarks, i / 30)
+            samples.append(time.perf_counter() - t0)
+        total_reps = reps.reps
+    total = float(np.sum(samples))
+    return {
+        "frames": len(samples),
+        "reps_per_pass": total_reps,
+        "fps": round(len(samples) / total, 1) if total else None,
+        "latency": latency_stats(samples),
+    }
+
+
+def bench_prediction(stream, exercise, infer_every=3, fps=30):
+    """
+    Replays the synthetic stream with skip-frame inference, taking the true
+    landmarks on inferred frames, and compares rep counting and the metric
+    against running on every frame.
+    """
+    truth = exercise.create_machine()
+    skipped = exercise.create_machine()
+    predictor = LandmarkPredictor(infer_every=infer_every, motion_threshold=0)
+    errors = []
+    for i, landmarks in enumerate(stream):
+        t = i / fps
+        truth.step(landmarks, t)
+        if predictor.should_infer(None, t):
+            predictor.update(landmarks, t)
+            estimate = landmarks
+        else:
+            estimate = predictor.predict(t)
+        skipped.step(estimate, t)
+        errors.append(abs(skipped.value - truth.value))
+    return {
+        "infer_every": infer_every,
+        "frames_inferred": predictor.inferred,
+        "frames_predicted": predictor.predicted,
+        "reps": [truth.reps, skipped.reps],
+        "good_reps": [truth.good_reps, skipped.good_reps],
+        "metric_error": {"mean": round(float(np.mean(errors)), 3), "max": round(float(np.max(errors)), 3)},
+    }
+
+
+def is_control(message):
+    return isinstance(message, str) and message.startswith('{"type": "control"')
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def bench_round_trip(jpegs, exercise_id, response_mode="jpeg", warmup=5):
+    """
+    Serves the pose router on a local port and streams the frames through
+    one session in lockstep, timing each frame from send to reply.
+    """
+    import uvicorn
+    import websockets
+    from fastapi import FastAPI
+    from pose_router import router
+
+    app = FastAPI()
+    app.include_router(router)
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+
+    async def session():
+        samples = []
+        async with websockets.connect(f"ws://127.0.0.1:{port}/pose/ws/analyze", max_size=None) as websocket:
+            await websocket.send(json.dumps({
+                "exercise_id": exercise_id,
+                "patient_id": "benchmark",
+                "timestamp": time.time(),
+                "response_mode": response_mode,
+            }))
+            start = time.perf_counter()
+            for i, frame_bytes in enumerate(jpegs):
+                t0 = time.perf_counter()
+                await websocket.send(frame_bytes)
+                while is_control(await websocket.recv()):
+                    pass  # Rate recommendations are not frame replies
+                if i >= warmup:
+                    samples.append(time.perf_counter() - t0)
+            elapsed = time.perf_counter() - start
+        return samples, elapsed
+
+    # Keep the handler's session logs out of the JSON report on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+        try:
+            samples, elapsed = asyncio.run(session())
+        finally:
+            server.should_exit = True
+            thread.join()
+
+    return {
+        "response_mode": response_mode,
+        "frames": len(samples),
+        "fps": round(len(jpegs) / elapsed, 1) if elapsed else None,
+        "latency": latency_stats(samples),
+    }
+
+
+def main(frames=300, exercise_type="curl", video=None, width=640, height=480,
+         response_mode="jpeg", skip_ws=False, target_size=TARGET_SIZE, infer_every=3, roi=False):
+    exercise = get_exercise(exercise_type)
+    stream = synthetic_landmarks(frames)
+    jpegs = recorded_frames(video, frames) if video else synthetic_frames(frames, width, height)
+    if not jpegs:
+        raise ValueError("No frames to benchmark")
+    width, height = jpeg_size(jpegs[0])
+    decoded_height, decoded_width = decode_jpeg(jpegs[0], target_size).shape[:2]
+
+    report = {
+        "meta": {
+            "input": video or "synthetic",
+            "exercise": exercise.exercise_id,
+            "resolution": [width, height],
+            "target_size": target_size,
+            "decoded_resolution": [decoded_width, decoded_height],
+            "mean_jpeg_bytes": int(np.mean([len(jpeg) for jpeg in jpegs])),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "mediapipe": getattr(mp, "__version__", None),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "pipeline": bench_pipeline(jpegs, stream, exercise, target_size),
+        "state_machine": bench_state_machine(stream, exercise),
+        "prediction": bench_prediction(stream, exercise, infer_every),
+    }
+    if roi:
+        # Same frames again, cropped to the person, to compare color + pose cost
+        report["pipeline_roi"] = bench_pipeline(jpegs, stream, exercise, target_size, PoseROI())
+    if not skip_ws:
+        report["round_trip"] = bench_round_trip(jpegs, exercise.exercise_id, response_mode)
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-stage pose session benchmark (JSON output)")
+    parser.add_argument("--frames", type=int, default=300, help="Frames per benchmark")
+    parser.add_argument("--exercise", type=str, default="curl",
+                        help=f'Exercise to run the state machine for ({", ".join(EXERCISES)})')
+    parser.add_argument("--video", type=str, default=None,
+                        help="Recorded clip to use instead of synthetic frames")
+    parser.add_argument("--width", type=int, default=640, help="Synthetic frame width")
+    parser.add_argument("--height", type=int, default=480, help="Synthetic frame height")
+    parser.add_argument("--target-size", type=int, default=TARGET_SIZE,
+                        help="Long side frames are decoded down to (0 for full size, see POSE_TARGET_SIZE)")
+    parser.add_argument("--infer-every", type=int, default=3,
+                        help="k for the skip-frame prediction replay (see POSE_INFER_EVERY)")
+    parser.add_argument("--roi", action="store_true",
+                        help="Also run the pipeline cropped to the person (see POSE_ROI_CROP)")
+    parser.add_argument("--response-mode", type=str, default="jpeg",
+                        help="Response mode for the websocket round trip")
+    parser.add_argument("--skip-ws", action="store_true", help="Skip the websocket round trip")
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = main(args.frames, args.exercise, args.video, args.width, args.height,
+                  args.response_mode, args.skip_ws, args.target_size, args.infer_every, args.roi)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,271 @@
+"""
+Declarative exercise registry.
+
+Exercise definitions live in exercises.json. Each one names the metric it
+tracks (a joint angle or a horizontal offset), the thresholds that move it
+between its rest and active stage, the range of motion a good rep must
+cover and any extra quality checks. Definitions are compiled once into
+landmark index tables, and every session gets a `RepStateMachine` whose
+`step(landmarks, t)` is the single rep-counting hot path shared by the
+websocket and the CLIs.
+"""
+import os
+import json
+import math
+import operator
+import numpy as np
+from joint_angles import joint_angles, compile_indices, compile_triplets
+
+EXERCISES_FILE = os.getenv(
+    "POSE_EXERCISES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "exercises.json")
+)
+
+# Threshold conditions usable in "start" and "finish"
+CONDITIONS = {
+    "below": operator.lt,
+    "above": operator.gt,
+    "outside": lambda value, threshold: abs(value) > threshold,
+    "inside": lambda value, threshold: abs(value) < threshold,
+}
+
+
+def _compile_condition(spec):
+    (name, threshold), = spec.items()
+    if name not in CONDITIONS:
+        raise ValueError(f"Unknown condition: {name}")
+    return CONDITIONS[name], threshold
+
+
+class AngleAboveCheck:
+    """
+    Passes when a joint angle is above `threshold` on the frame a rep completes.
+    """
+
+    def __init__(self, spec, angle_column):
+        self.angle_column = angle_column
+        self.threshold = spec["threshold"]
+        self.feedback = spec["feedback"]
+
+    def passes(self, machine, landmarks, angles):
+        return angles[self.angle_column] > self.threshold
+
+
+class StabilityCheck:
+    """
+    Passes when `point` moved less than `max_movement` between any two frames
+    of the rep, relative to the anchor-to-end distance (e.g. shoulder to wrist).
+    """
+
+    def __init__(self, spec, track):
+        self.track = track
+        self.point, self.anchor, self.end = compile_indices(spec["point"], spec["anchor"], spec["end"])
+        self.max_movement = spec["max_movement"]
+        self.feedback = spec["feedback"]
+
+    def passes(self, machine, landmarks, angles):
+        positions = machine.tracks[self.track]
+        if len(positions) < 2:
+            return True
+        movement = np.max(np.linalg.norm(np.diff(positions, axis=0), axis=1))
+        length = np.linalg.norm(landmarks[self.anchor, :3] - landmarks[self.end, :3])
+        return not (length > 0 and movement / length > self.max_movement)
+
+
+class ExerciseDefinition:
+    """
+    One exercise from the registry, compiled into index tables.
+    """
+
+    def __init__(self, exercise_id, spec):
+        self.exercise_id = exercise_id
+        self.aliases = spec.get("aliases", [])
+        self.rest_stage = spec["rest_stage"]
+        self.active_stage = spec["active_stage"]
+        self.start = _compile_condition(spec["start"])
+        self.finish = _compile_condition(spec["finish"])
+        self.rom = spec.get("rom", {})
+        self.feedback = spec.get("feedback", {})
+
+        # Every angle this exercise needs is computed in one joint_angles call
+        triplets = []
+        metric = spec["metric"]
+        if "angle" in metric:
+            triplets.append(metric["angle"])
+            self.offset_points = None
+        else:
+            offset = metric["offset_x"]
+            self.offset_points = compile_indices(offset["point"], *offset["from_mid"])
+
+        self.checks = []
+        self.tracked_points = []
+        for check in spec.get("checks", []):
+            if check["type"] == "angle_above":
+                self.checks.append(AngleAboveCheck(check, len(triplets)))
+                triplets.append(check["angle"])
+            elif check["type"] == "stability":
+                self.checks.append(StabilityCheck(check, len(self.tracked_points)))
+                self.tracked_points.append(compile_indices(check["point"])[0])
+            else:
+                raise ValueError(f"Unknown check type for {exercise_id}: {check['type']}")
+
+        self.triplets = compile_triplets(*triplets)
+
+    def measure(self, landmarks):
+        """
+        Returns (metric value, angles) for (33, 4) landmarks, or batched (..., 33, 4).
+        `angles` has one column per triplet: the metric angle first, then angle checks.
+        """
+        angles = joint_angles(landmarks, self.triplets) if len(self.triplets) else None
+        if self.offset_points is None:
+            return angles[..., 0], angles
+
+        x = np.asarray(landmarks)[..., self.offset_points, 0]
+        return x[..., 0] - (x[..., 1] + x[..., 2]) / 2, angles
+
+    def create_machine(self):
+        return RepStateMachine(self)
+
+
+class RepStateMachine:
+    """
+    Per-session rep counter driven by one exercise definition.
+
+    Call `step(landmarks, t)` once per frame with the frame's (33, 4) array
+    (or None when nobody was detected) and its timestamp in seconds. It
+    returns a dict describing the rep when one completes, otherwise None.
+    """
+
+    def __init__(self, definition):
+        self.definition = definition
+        self.stage = definition.rest_stage
+        self.reps = 0
+        self.good_reps = 0
+        self.feedback = ""
+        self.value = None       # Last metric value (angle in degrees or offset)
+        self.frame = -1         # Index of the last stepped frame
+        self.rep_log = []       # One dict per completed rep
+        self.tracks = [[] for _ in definition.tracked_points]
+
+        self._rep_min, self._rep_max = math.inf, -math.inf
+        self._rep_start_time = None
+        self._rep_start_frame = None
+
+    def step(self, landmarks, t):
+        self.frame += 1
+        # NaN landmarks (e.g. a recorded frame without a detection) count as
+        # missed, as in rescore.py; joint_angles would read them as 0 degrees
+        if landmarks is None or np.isnan(landmarks).any():
+            return None
+
+        definition = self.definition
+        value, angles = definition.measure(landmarks)
+        value = float(value)
+        self.value = value
+        self._rep_min = min(self._rep_min, value)
+        self._rep_max = max(self._rep_max, value)
+        for track, point in zip(self.tracks, definition.tracked_points):
+            track.append(landmarks[point, :3])
+
+        if self.stage == definition.rest_stage:
+            condition, threshold = definition.start
+            if condition(value, threshold):
+                active = definition.active_stage
+                if isinstance(active, list):
+                    # Two-sided movement: [negative side, positive side]
+                    active = active[1] if value > 0 else active[0]
+                self.stage = active
+                self._rep_start_time = t
+                self._rep_start_frame = self.frame
+            return None
+
+        condition, threshold = definition.finish
+        if condition(value, threshold):
+            return self._complete_rep(landmarks, angles, t)
+        return None
+
+    def _complete_rep(self, landmarks, angles, t):
+        definition = self.definition
+        self.stage = definition.rest_stage
+        self.reps += 1
+
+        # Later failures win, so the more specific check's feedback is shown
+        failures = []
+        rom = definition.rom
+        if rom:
+            rom_ok = (
+                ("min_below" not in rom or self._rep_min < rom["min_below"])
+                and ("max_above" not in rom or self._rep_max > rom["max_above"])
+            )
+            if not rom_ok:
+                failures.append(definition.feedback.get("rom", "Bad ROM!"))
+        for check in definition.checks:
+            if not check.passes(self, landmarks, angles):
+                failures.append(check.feedback)
+
+        good = not failures
+        if good:
+            self.good_reps += 1
+        self.feedback = failures[-1] if failures else definition.feedback.get("good", "Good Rep!")
+
+        rep = {
+            "rep": self.reps,
+            "start_frame": self._rep_start_frame,
+            "end_frame": self.frame,
+            "duration": t - self._rep_start_time if self._rep_start_time is not None else 0,
+            "min_value": self._rep_min,
+            "max_value": self._rep_max,
+            "good": good,
+            "feedback": self.feedback,
+        }
+        self.rep_log.append(rep)
+
+        self._rep_min, self._rep_max = math.inf, -math.inf
+        self._rep_start_time = None
+        self._rep_start_frame = None
+        for track in self.tracks:
+            track.clear()
+        return rep
+
+    def summary(self):
+        durations = [rep["duration"] for rep in self.rep_log]
+        return {
+            "total_reps": self.reps,
+            "good_reps": self.good_reps,
+            "average_rep_time": float(np.mean(durations)) if durations else 0.0,
+        }
+
+
+def _normalize(name):
+    return str(name).strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def load_exercises(path=EXERCISES_FILE):
+    """
+    Loads and compiles every exercise definition in a JSON file.
+    """
+    with open(path) as f:
+        specs = json.load(f)
+    return {exercise_id: ExerciseDefinition(exercise_id, spec) for exercise_id, spec in specs.items()}
+
+
+# Compiled once at import
+EXERCISES = load_exercises()
+_LOOKUP = {
+    _normalize(name): definition
+    for definition in EXERCISES.values()
+    for name in [definition.exercise_id, *definition.aliases]
+}
+
+
+def get_exercise(name):
+    """
+    Finds an exercise by id, alias or display title (e.g. "Lateral Raise"),
+    singular or plural ("Lateral Raises", "Squats").
+    """
+    key = _normalize(name)
+    definition = _LOOKUP.get(key)
+    if definition is None and key.endswith("s"):
+        definition = _LOOKUP.get(key[:-1])
+    if definition is None:
+        raise ValueError(f"Unknown exercise_id: {name}")
+    return definition
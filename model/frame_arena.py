@@ -0,0 +1,50 @@
+import numpy as np
+
+
+class FrameArena:
+    """
+    Per-session set of reusable frame buffers.
+
+    `buffer(name, shape)` hands out the same preallocated array every frame
+    (to be filled through OpenCV's `dst=` parameter) and keeps one per shape,
+    so it only allocates for a size it has not seen yet (e.g. each of the few
+    PoseROI crop sizes once). Allocations the pipeline cannot
+    avoid, such as imdecode and imencode output, are recorded with
+    `count()`, so `stats()` shows what each frame really costs.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+        self.frames = 0
+        self.allocations = 0
+        self.bytes_allocated = 0
+        self.reuses = 0
+
+    def buffer(self, name, shape, dtype=np.uint8):
+        key = (name, tuple(shape), np.dtype(dtype))
+        buf = self._buffers.get(key)
+        if buf is None:
+            buf = self.count(np.empty(shape, dtype))
+            self._buffers[key] = buf
+        else:
+            self.reuses += 1
+        return buf
+
+    def count(self, array):
+        """
+        Records an allocation made outside the arena and returns the array.
+        """
+        self.allocations += 1
+        self.bytes_allocated += array.nbytes
+        return array
+
+    def stats(self):
+        frames = max(self.frames, 1)
+        return {
+            "frames": self.frames,
+            "allocations": self.allocations,
+            "bytes_allocated": self.bytes_allocated,
+            "buffer_reuses": self.reuses,
+            "allocations_per_frame": round(self.allocations / frames, 2),
+            "bytes_per_frame": int(self.bytes_allocated / frames),
+        }
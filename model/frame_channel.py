@@ -0,0 +1,84 @@
+import asyncio
+
+
+class LatestSlot:
+    """
+    Single-item mailbox where a new item replaces any unconsumed one.
+
+    Used on both sides of the pose websocket: incoming frames wait here for
+    the inference loop, and annotated frames wait here for the sender. When
+    the consumer is slower than the producer, stale items are dropped and
+    counted instead of queueing up behind the newest one.
+    """
+
+    def __init__(self):
+        self._item = None
+        self._has_item = False
+        self._event = asyncio.Event()
+        self._closed = False
+        self.accepted = 0
+        self.dropped = 0
+
+    def put(self, item):
+        if self._closed:
+            return
+        if self._has_item:
+            self.dropped += 1
+        self._item = item
+        self._has_item = True
+        self.accepted += 1
+        self._event.set()
+
+    def close(self):
+        """
+        Wakes the consumer; `get()` returns None once the slot is drained.
+        """
+        self._closed = True
+        self._event.set()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    async def get(self):
+        """
+        Waits for and returns the newest item, or None once closed and empty.
+        """
+        while not self._has_item:
+            if self._closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+
+        item = self._item
+        self._item = None
+        self._has_item = False
+        return item
+
+
+async def receive_frames(websocket, inbox):
+    """
+    Reads binary frames off the socket into `inbox` until the client goes away.
+    """
+    try:
+        while True:
+            inbox.put(await websocket.receive_bytes())
+    except Exception:
+        pass  # Disconnect - the consumer sees the closed slot
+    finally:
+        inbox.close()
+
+
+async def send_frames(websocket, outbox):
+    """
+    Sends the newest item in `outbox` until it is closed and drained.
+    Text items go out as text messages, everything else as binary.
+    """
+    try:
+        while (item := await outbox.get()) is not None:
+            if isinstance(item, str):
+                await websocket.send_text(item)
+            else:
+                await websocket.send_bytes(item)
+    finally:
+        outbox.close()
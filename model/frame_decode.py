@@ -0,0 +1,68 @@
+import os
+import struct
+import cv2
+import numpy as np
+
+# --- Configuration ---
+# Long side in pixels that frames are decoded down to before inference.
+# MediaPipe resizes to its own input size anyway, so decoding a 1080p frame at
+# full size only costs time and memory. 0 decodes every frame at full size.
+TARGET_SIZE = int(os.getenv("POSE_TARGET_SIZE", 640))
+
+# (scale factor, flag), largest reduction first
+REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Start-of-frame markers carry the image size; C4, C8 and CC are other segments
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data):
+    """
+    Reads (width, height) from a JPEG's start-of-frame header without decoding it.
+    Returns None if the data is not a JPEG or the header cannot be found.
+    """
+    if data[:2] != b"\xff\xd8":
+        return None
+    i, n = 2, len(data)
+    while i + 4 <= n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # Fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:  # Markers without a length
+            i += 2
+            continue
+        length = struct.unpack_from(">H", data, i + 2)[0]
+        if marker in _SOF_MARKERS and i + 9 <= n:
+            height, width = struct.unpack_from(">HH", data, i + 5)
+            return width, height
+        i += 2 + length
+    return None
+
+
+def reduced_decode_flag(width, height, target_size=TARGET_SIZE):
+    """
+    Picks the imdecode flag with the largest 1/2, 1/4 or 1/8 reduction that
+    keeps the long side at or above `target_size`.
+    """
+    if target_size > 0:
+        long_side = max(width, height)
+        for factor, flag in REDUCED_FLAGS:
+            if long_side // factor >= target_size:
+                return flag
+    return cv2.IMREAD_COLOR
+
+
+def decode_jpeg(frame_bytes, target_size=TARGET_SIZE):
+    """
+    Decodes a JPEG frame, directly at reduced scale when it is larger than the target size.
+    """
+    size = jpeg_size(frame_bytes)
+    flag = reduced_decode_flag(*size, target_size) if size else cv2.IMREAD_COLOR
+    return cv2.imdecode(np.frombuffer(frame_bytes, np.uint8), flag)
@@ -0,0 +1,43 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# --- Configuration ---
+# Threads used for MediaPipe inference and JPEG decode/encode. MediaPipe and
+# OpenCV release the GIL while they work, so a thread pool lets one uvicorn
+# worker run several patient sessions at once without blocking the event loop.
+INFERENCE_WORKERS = int(os.getenv("POSE_INFERENCE_WORKERS", os.cpu_count() or 1))
+
+_executor = None
+
+
+def get_inference_executor():
+    """
+    Returns the shared inference executor, creating it on first use.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=INFERENCE_WORKERS,
+            thread_name_prefix="pose-inference",
+        )
+    return _executor
+
+
+async def run_inference(func, *args, **kwargs):
+    """
+    Runs a blocking function on the inference executor and awaits its result.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_inference_executor(), partial(func, *args, **kwargs))
+
+
+def shutdown_inference_executor():
+    """
+    Waits for in-flight frames to finish and releases the executor threads.
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
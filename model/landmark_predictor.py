@@ -0,0 +1,107 @@
+"""
+Skip-frame pose tracking.
+
+Running MediaPipe on every frame is the main per-patient CPU cost. A
+`LandmarkPredictor` decides per frame whether the model has to run: at
+least every `infer_every` frames, earlier when the image changed by more
+than `motion_threshold`, and whenever the prediction would drift further
+than `max_drift` from the last detection. On the frames in between the
+landmarks are extrapolated from the last two detections with a constant
+velocity model, so rep counting still sees a value every frame.
+"""
+import os
+import cv2
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+# --- Configuration ---
+INFER_EVERY = int(os.getenv("POSE_INFER_EVERY", 1))                 # Run the model at least every k-th frame (1 = every frame)
+MOTION_THRESHOLD = float(os.getenv("POSE_MOTION_THRESHOLD", 0))     # Mean gray-level change (0-255) that forces inference, 0 = off
+MAX_DRIFT = float(os.getenv("POSE_MAX_DRIFT", 0.05))                # Max predicted landmark movement (image fraction) from the last detection
+
+
+def to_pose_landmarks(landmarks):
+    """
+    Wraps a (33, 4) array as MediaPipe pose landmarks so it can be drawn.
+    """
+    return landmark_pb2.NormalizedLandmarkList(landmark=[
+        landmark_pb2.NormalizedLandmark(x=x, y=y, z=z, visibility=v) for x, y, z, v in landmarks.tolist()
+    ])
+
+
+def motion_thumbnail(frame_bytes):
+    """
+    Decodes a JPEG at 1/8 scale in grayscale, cheap enough to run on every frame.
+    """
+    return cv2.imdecode(np.frombuffer(frame_bytes, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+
+
+class LandmarkPredictor:
+    """
+    Per-session constant velocity predictor for the (33, 4) landmark array.
+    """
+
+    def __init__(self, infer_every=INFER_EVERY, motion_threshold=MOTION_THRESHOLD, max_drift=MAX_DRIFT):
+        self.infer_every = max(1, infer_every)
+        self.motion_threshold = motion_threshold
+        self.max_drift = max_drift
+        self.inferred = 0
+        self.predicted = 0
+
+        self._last = None       # Last detected landmarks
+        self._last_t = None
+        self._velocity = None   # Per-landmark x, y, z change per second
+        self._thumb = None      # Motion thumbnail of the last inferred frame
+        self._since_inference = 0
+
+    @property
+    def enabled(self):
+        return self.infer_every > 1 or self.motion_threshold > 0
+
+    def should_infer(self, frame_bytes, t):
+        """
+        Returns True when the model has to run on this frame.
+        """
+        if not self.enabled or self._last is None or self._velocity is None:
+            return True
+        if self._since_inference + 1 >= self.infer_every:
+            return True
+
+        drift = np.abs(self._velocity[:, :2] * (t - self._last_t)).max()
+        if drift > self.max_drift:
+            return True
+
+        if self.motion_threshold > 0:
+            thumb = motion_thumbnail(frame_bytes)
+            if thumb is None or self._thumb is None or thumb.shape != self._thumb.shape:
+                return True
+            if cv2.absdiff(thumb, self._thumb).mean() > self.motion_threshold:
+                return True
+        return False
+
+    def update(self, landmarks, t, frame_bytes=None):
+        """
+        Records a detection. `landmarks` is None when nobody was found,
+        which stops prediction until the next detection.
+        """
+        self.inferred += 1
+        self._since_inference = 0
+        if landmarks is None:
+            self._last = self._velocity = None
+            return
+
+        if self._last is not None and t > self._last_t:
+            self._velocity = (landmarks[:, :3] - self._last[:, :3]) / (t - self._last_t)
+        self._last, self._last_t = landmarks, t
+        if self.motion_threshold > 0 and frame_bytes is not None:
+            self._thumb = motion_thumbnail(frame_bytes)
+
+    def predict(self, t):
+        """
+        Extrapolates the landmarks to time `t` from the last two detections.
+        """
+        self.predicted += 1
+        self._since_inference += 1
+        predicted = self._last.copy()
+        predicted[:, :3] += self._velocity * (t - self._last_t)
+        return predicted
@@ -0,0 +1,202 @@
+"""
+Multi-session load generator for /pose/ws/analyze.
+
+Starts N simulated patients against a running server, each streaming
+frames from a local video (or a directory of pre-encoded JPEGs) at a fixed
+frame rate, and ramps N through the given levels. Like a well-behaved
+client, a session keeps at most one frame in flight: a tick that comes
+while the previous frame is still unanswered is skipped. This keeps the
+send-to-reply latency exact.
+
+Each level reports send-to-reply latency, skipped ticks, the server-side
+drop counters from the final summaries, and how late those summaries
+arrived. The first level whose p95 latency exceeds the real-time budget
+is reported as the saturation point, e.g.
+
+    python load_test.py --source clips/curl.mp4 --levels 1,2,4,8 --fps 15 --budget-ms 100
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+import websockets
+from benchmark import latency_stats, recorded_frames, synthetic_frames
+
+# --- Configuration ---
+WEBSOCKET_URI = "ws://127.0.0.1:8000/pose/ws/analyze"
+SESSION_SECONDS = float(os.getenv("POSE_SESSION_TIMEOUT", 30))  # Must match the server's session timeout
+SUMMARY_GRACE = 5.0  # Seconds to wait for the final summary after the session should have ended
+
+
+def load_frames(source, limit=300):
+    """
+    Returns JPEG frames from a video file or a directory of .jpg files.
+    Without a source, synthetic frames are used.
+    """
+    if source is None:
+        return synthetic_frames(limit)
+    if os.path.isdir(source):
+        names = sorted(name for name in os.listdir(source) if name.lower().endswith((".jpg", ".jpeg")))
+        frames = []
+        for name in names[:limit]:
+            with open(os.path.join(source, name), "rb") as f:
+                frames.append(f.read())
+        return frames
+    return recorded_frames(source, limit)
+
+
+async def run_session(uri, frames, exercise_id, response_mode, fps, session_seconds, index):
+    """
+    Runs one simulated patient session and returns its measurements.
+    """
+    stats = {
+        "latencies": [], "sent": 0, "skipped": 0, "replies": 0,
+        "summary": None, "summary_delay": None, "error": None, "recommended_fps": None,
+    }
+    in_flight = {"sent_at": None}
+
+    async with websockets.connect(uri, max_size=None) as websocket:
+        await websocket.send(json.dumps({
+            "exercise_id": exercise_id,
+            "patient_id": f"load_test_{index:03d}",
+            "timestamp": time.time(),
+            "response_mode": response_mode,
+        }))
+        start = time.perf_counter()
+
+        async def receive():
+            async for message in websocket:
+                now = time.perf_counter()
+                if isinstance(message, str):
+                    if message.startswith("ERROR"):
+                        stats["error"] = message
+                        return
+                    data = json.loads(message)
+                    if data.get("type") == "control":
+                        # Kept at the fixed --fps rate; the recommendation is only reported
+                        stats["recommended_fps"] = data["fps"]
+                        continue
+                    if data.get("type") != "frame":
+                        stats["summary"] = data
+                        stats["summary_delay"] = now - start - session_seconds
+                        return
+                stats["replies"] += 1
+                if in_flight["sent_at"] is not None:
+                    stats["latencies"].append(now - in_flight["sent_at"])
+                    in_flight["sent_at"] = None
+
+        async def send():
+            tick = 0
+            while time.perf_counter() - start < session_seconds + SUMMARY_GRACE:
+                # Fixed-rate ticks, not a fixed sleep after each send
+                await asyncio.sleep(max(0.0, start + tick / fps - time.perf_counter()))
+                if in_flight["sent_at"] is not None:
+                    stats["skipped"] += 1
+                else:
+                    in_flight["sent_at"] = time.perf_counter()
+                    await websocket.send(frames[tick % len(frames)])
+                    stats["sent"] += 1
+                tick += 1
+
+        receiver = asyncio.create_task(receive())
+        sender = asyncio.create_task(send())
+        try:
+            await asyncio.wait([receiver, sender], return_when=asyncio.FIRST_COMPLETED)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            sender.cancel()
+            receiver.cancel()
+
+    return stats
+
+
+async def run_level(sessions, uri, frames, exercise_id, response_mode, fps, session_seconds, ramp_seconds):
+    """
+    Runs `sessions` concurrent sessions, started evenly over `ramp_seconds`.
+    """
+    async def delayed(index):
+        await asyncio.sleep(ramp_seconds * index / sessions)
+        return await run_session(uri, frames, exercise_id, response_mode, fps, session_seconds, index)
+
+    results = await asyncio.gather(*(delayed(i) for i in range(sessions)), return_exceptions=True)
+    failed = [r for r in results if isinstance(r, Exception)]
+    results = [r for r in results if not isinstance(r, Exception)]
+
+    latencies = [latency for r in results for latency in r["latencies"]]
+    summaries = [r["summary"] for r in results if r["summary"]]
+    delays = [r["summary_delay"] for r in results if r["summary_delay"] is not None]
+    session_p95 = [np.percentile(r["latencies"], 95) * 1000 for r in results if r["latencies"]]
+    return {
+        "sessions": sessions,
+        "failed_sessions": len(failed) + sum(1 for r in results if r["error"]),
+        "frames_sent": sum(r["sent"] for r in results),
+        "replies": sum(r["replies"] for r in results),
+        "ticks_skipped": sum(r["skipped"] for r in results),
+        "reply_fps_per_session": round(float(np.mean([r["replies"] for r in results])) / session_seconds, 1)
+        if results else 0.0,
+        "latency": latency_stats(latencies),
+        "worst_session_p95_ms": round(float(max(session_p95)), 3) if session_p95 else None,
+        "recommended_fps": min((r["recommended_fps"] for r in results if r["recommended_fps"]), default=None),
+        "summaries_received": len(summaries),
+        "summary_delay_p95_s": round(float(np.percentile(delays, 95)), 3) if delays else None,
+        "frames_dropped_in": sum(s.get("frames_dropped_in", 0) for s in summaries),
+        "frames_dropped_out": sum(s.get("frames_dropped_out", 0) for s in summaries),
+    }
+
+
+def main(uri, source, levels, exercise_id="curl", response_mode="landmarks", fps=15.0,
+         budget_ms=100.0, session_seconds=SESSION_SECONDS, ramp_seconds=1.0):
+    frames = load_frames(source)
+    if not frames:
+        raise ValueError(f"No frames found in '{source}'")
+
+    report = {"uri": uri, "fps": fps, "budget_ms": budget_ms, "response_mode": response_mode,
+              "levels": [], "saturated_at": None}
+    print(f"{'sessions':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'fps/sess':>9} "
+          f"{'skipped':>8} {'drop in':>8} {'drop out':>9} {'summaries':>10}")
+    for sessions in levels:
+        level = asyncio.run(run_level(sessions, uri, frames, exercise_id, response_mode,
+                                      fps, session_seconds, ramp_seconds))
+        report["levels"].append(level)
+        latency = level["latency"]
+        print(f"{sessions:>8} {latency.get('p50_ms', 0):>8.1f} {latency.get('p95_ms', 0):>8.1f} "
+              f"{latency.get('p99_ms', 0):>8.1f} {level['reply_fps_per_session']:>9.1f} "
+              f"{level['ticks_skipped']:>8} {level['frames_dropped_in']:>8} {level['frames_dropped_out']:>9} "
+              f"{level['summaries_received']:>6}/{sessions}")
+
+        if latency.get("p95_ms", 0) > budget_ms and report["saturated_at"] is None:
+            report["saturated_at"] = sessions
+
+    print("----------------------------------")
+    if report["saturated_at"] is None:
+        print(f"p95 latency stayed within {budget_ms:.0f} ms up to {levels[-1]} sessions")
+    else:
+        print(f"p95 latency crossed {budget_ms:.0f} ms at {report['saturated_at']} concurrent sessions")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent session load test for /pose/ws/analyze")
+    parser.add_argument("--uri", type=str, default=WEBSOCKET_URI, help="Websocket endpoint")
+    parser.add_argument("--source", type=str, default=None,
+                        help="Video file or directory of .jpg frames (synthetic frames if omitted)")
+    parser.add_argument("--levels", type=str, default="1,2,4,8,16",
+                        help="Comma-separated concurrent session counts to ramp through")
+    parser.add_argument("--exercise", type=str, default="curl", help="exercise_id sent in the init message")
+    parser.add_argument("--response-mode", type=str, default="landmarks", help="jpeg, landmarks or binary")
+    parser.add_argument("--fps", type=float, default=15.0, help="Frames per second each session sends")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="Real-time latency budget per frame")
+    parser.add_argument("--session-seconds", type=float, default=SESSION_SECONDS,
+                        help="Server session length (POSE_SESSION_TIMEOUT)")
+    parser.add_argument("--ramp-seconds", type=float, default=1.0, help="Spread session starts over this long")
+    parser.add_argument("--output", type=str, default=None, help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    report = main(args.uri, args.source, [int(n) for n in args.levels.split(",")], args.exercise,
+                  args.response_mode, args.fps, args.budget_ms, args.session_seconds, args.ramp_seconds)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,53 @@
+import json
+import numpy as np
+from pose_wire import encode_frame
+
+# --- Response modes for /pose/ws/analyze ---
+# "jpeg"      - every frame is echoed back annotated and re-encoded (legacy clients)
+# "landmarks" - only landmarks and rep state are sent as JSON, the client draws the overlay
+# "binary"    - same content as "landmarks", packed with pose_wire
+RESPONSE_MODES = ("jpeg", "landmarks", "binary")
+DEFAULT_RESPONSE_MODE = "jpeg"
+
+
+def get_response_mode(config):
+    """
+    Reads and validates the response mode from an init message.
+    """
+    mode = config.get("response_mode", DEFAULT_RESPONSE_MODE)
+    if mode not in RESPONSE_MODES:
+        raise ValueError(f"Unknown response_mode: {mode}")
+    return mode
+
+
+def binary_frame_message(frame_id, landmarks, **state):
+    """
+    Builds the per-frame message sent in "binary" mode. Takes the same arguments as `frame_message`.
+    """
+    return encode_frame(frame_id, landmarks, **state)
+
+
+def frame_message(frame_id, landmarks, **state):
+    """
+    Builds the per-frame JSON message sent in "landmarks" mode.
+    `landmarks` is the frame's (33, 4) array or None; `state` carries the
+    exercise state, e.g. angle, stage, reps and feedback.
+    """
+    angle = state.get("angle")
+    if angle is not None:
+        state["angle"] = round(float(angle), 1)
+
+    return json.dumps({
+        "type": "frame",
+        "frame_id": frame_id,
+        "landmarks": None if landmarks is None else np.round(landmarks, 4).tolist(),
+        **state,
+    })
+
+
+def control_message(fps, max_size):
+    """
+    Builds the control message telling the client how fast and how large to capture.
+    `max_size` is the recommended long side of sent frames in pixels.
+    """
+    return json.dumps({"type": "control", "fps": fps, "max_size": max_size})
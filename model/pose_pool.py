@@ -0,0 +1,155 @@
+import os
+import time
+import asyncio
+import numpy as np
+import mediapipe as mp
+from inference import run_inference
+
+# --- Configuration ---
+POOL_MAX_SIZE = int(os.getenv("POSE_POOL_MAX_SIZE", 16))       # Max Pose instances alive at once
+POOL_WARM_SIZE = int(os.getenv("POSE_POOL_WARM_SIZE", 2))      # Instances primed at startup and never evicted
+POOL_IDLE_TIMEOUT = float(os.getenv("POSE_POOL_IDLE_TIMEOUT", 300))  # Seconds before an extra idle instance is closed
+POOL_ACQUIRE_TIMEOUT = float(os.getenv("POSE_POOL_ACQUIRE_TIMEOUT", 10))  # Seconds a session waits for a free instance, 0 waits forever
+
+WARMUP_FRAME = np.zeros((256, 256, 3), dtype=np.uint8)
+
+
+def create_pose():
+    """
+    Builds a Pose instance with the settings used by every session.
+    """
+    return mp.solutions.pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+
+def create_warm_pose(factory=create_pose):
+    """
+    Builds a Pose instance and runs a dummy inference through it so the
+    model graph is fully initialised before a patient's first frame.
+    Blocking - meant to run on the inference executor.
+    """
+    pose = factory()
+    pose.process(WARMUP_FRAME)
+    pose.reset()
+    return pose
+
+
+class PosePool:
+    """
+    Bounded pool of pre-warmed Pose instances.
+
+    A session checks an instance out with `acquire()` and hands it back with
+    `release()`, which resets its tracking state for the next patient.
+    Idle instances beyond `warm_size` are closed after `idle_timeout` seconds.
+    """
+
+    def __init__(self, max_size=POOL_MAX_SIZE, warm_size=POOL_WARM_SIZE,
+                 idle_timeout=POOL_IDLE_TIMEOUT, acquire_timeout=POOL_ACQUIRE_TIMEOUT, factory=create_pose):
+        self.max_size = max_size
+        self.warm_size = min(warm_size, max_size)
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.factory = factory
+
+        self._idle = []  # (pose, last_used) pairs, oldest first
+        self._slots = asyncio.Semaphore(max_size)
+        self._closed = False
+        self._evictor = None  # Background task closing idle instances while there is no traffic
+        self.in_use = 0  # Checked-out instances, i.e. live sessions
+
+    async def warmup(self):
+        """
+        Fills the pool up to `warm_size` primed instances and starts the
+        periodic eviction of extra idle instances.
+        """
+        if self._evictor is None and self.idle_timeout > 0:
+            self._evictor = asyncio.create_task(self._evict_periodically())
+
+        needed = self.warm_size - len(self._idle)
+        if needed <= 0:
+            return
+        poses = await asyncio.gather(
+            *(run_inference(create_warm_pose, self.factory) for _ in range(needed))
+        )
+        now = time.monotonic()
+        self._idle[:0] = [(pose, now) for pose in poses]
+        print(f"Pose pool warmed with {len(poses)} instance(s)")
+
+    async def acquire(self):
+        """
+        Checks out a Pose instance, waiting if `max_size` are already in use.
+        Raises asyncio.TimeoutError when none frees up within `acquire_timeout`.
+        """
+        await asyncio.wait_for(self._slots.acquire(), self.acquire_timeout or None)
+        try:
+            if self._idle:
+                # Most recently used first, so extra instances age out
+                pose, _ = self._idle.pop()
+            else:
+                pose = await run_inference(create_warm_pose, self.factory)
+        except BaseException:
+            self._slots.release()
+            raise
+        self.in_use += 1
+        return pose
+
+    async def release(self, pose):
+        """
+        Resets a checked-out instance and returns it to the pool.
+        """
+        try:
+            if self._closed:
+                await run_inference(pose.close)
+                return
+            await run_inference(pose.reset)
+        except Exception as e:
+            print(f"Discarding Pose instance that failed to reset: {e}")
+            await run_inference(pose.close)
+        else:
+            self._idle.append((pose, time.monotonic()))
+        finally:
+            self.in_use -= 1
+            self._slots.release()
+
+        await self.evict_idle()
+
+    async def evict_idle(self):
+        """
+        Closes instances idle for longer than `idle_timeout`, keeping `warm_size`.
+        """
+        cutoff = time.monotonic() - self.idle_timeout
+        stale = []
+        while len(self._idle) > self.warm_size and self._idle[0][1] < cutoff:
+            stale.append(self._idle.pop(0)[0])
+
+        for pose in stale:
+            await run_inference(pose.close)
+
+    async def _evict_periodically(self):
+        # release() only evicts when sessions end, so an idle server needs this
+        interval = max(self.idle_timeout / 2, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                print(f"Idle Pose eviction failed: {e}")
+
+    async def close(self):
+        """
+        Closes every idle instance. Checked-out instances are closed on release.
+        """
+        self._closed = True
+        if self._evictor is not None:
+            self._evictor.cancel()
+            try:
+                await self._evictor
+            except asyncio.CancelledError:
+                pass
+            self._evictor = None
+        idle, self._idle = self._idle, []
+        for pose, _ in idle:
+            await run_inference(pose.close)
+
+
+# Shared pool used by the websocket handlers
+pose_pool = PosePool()
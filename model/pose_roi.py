@@ -0,0 +1,107 @@
+"""
+Person region-of-interest cropping.
+
+The patient usually fills only part of the webcam image. `PoseROI` keeps a
+crop box around the last detected landmarks, expanded by a margin, so the
+color conversion and pose.process only see that region. Landmarks found in
+the crop are mapped back to full-frame coordinates. The box only moves when
+the person gets close to its edge, which keeps MediaPipe's own frame-to-frame
+tracking valid, and it is dropped (full frame) as soon as nobody is detected.
+Box sides are rounded up to a few fixed fractions of the frame, so a refit
+usually only moves the box: the crop keeps its shape, its buffer is reused
+and MediaPipe sees the same image size.
+"""
+import os
+import numpy as np
+
+# --- Configuration ---
+ROI_CROP = os.getenv("POSE_ROI_CROP", "0") == "1"          # Crop frames to the person before inference
+ROI_MARGIN = float(os.getenv("POSE_ROI_MARGIN", 0.3))       # Added on each side, as a fraction of the person's size
+ROI_EDGE = 0.05          # Refit the box when a landmark gets this close (fraction of the crop) to its edge
+MIN_VISIBILITY = 0.5     # Landmarks below this visibility do not shape the box
+ROI_SIZES = (0.5, 0.75)  # Box sides as fractions of the frame's, anything larger is the full side
+
+
+class PoseROI:
+    """
+    Per-session crop box in full-frame pixels, or None for the full frame.
+    """
+
+    def __init__(self, margin=ROI_MARGIN, edge=ROI_EDGE, sizes=ROI_SIZES):
+        self.margin = margin
+        self.edge = edge
+        self.sizes = sizes
+        self.box = None  # (x0, y0, x1, y1)
+        self.cropped = 0
+        self.refits = 0
+
+    def crop(self, frame):
+        """
+        Returns (view of the frame to run inference on, box used).
+        The view shares memory with the frame, nothing is copied.
+        """
+        if self.box is None:
+            return frame, None
+        x0, y0, x1, y1 = self.box
+        self.cropped += 1
+        return frame[y0:y1, x0:x1], self.box
+
+    @staticmethod
+    def to_full_frame(landmarks, box, frame_shape):
+        """
+        Maps (33, 4) landmarks normalized to the crop back to the full frame.
+        """
+        if box is None or landmarks is None:
+            return landmarks
+        h, w = frame_shape[:2]
+        x0, y0, x1, y1 = box
+        mapped = landmarks.copy()
+        mapped[:, 0] = (landmarks[:, 0] * (x1 - x0) + x0) / w
+        mapped[:, 1] = (landmarks[:, 1] * (y1 - y0) + y0) / h
+        mapped[:, 2] = landmarks[:, 2] * (x1 - x0) / w  # z is on the same scale as x
+        return mapped
+
+    def update(self, landmarks, frame_shape):
+        """
+        Updates the box from full-frame landmarks. None falls back to the full frame.
+        """
+        if landmarks is None:
+            self.box = None
+            return
+        h, w = frame_shape[:2]
+        visible = landmarks[landmarks[:, 3] >= MIN_VISIBILITY]
+        if len(visible) < 2:
+            self.box = None
+            return
+
+        xs, ys = visible[:, 0] * w, visible[:, 1] * h
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            ex, ey = (x1 - x0) * self.edge, (y1 - y0) * self.edge
+            inside = (xs.min() > x0 + ex and xs.max() < x1 - ex
+                      and ys.min() > y0 + ey and ys.max() < y1 - ey)
+            if inside:
+                return
+
+        bw = self.side(xs.max() - xs.min(), w)
+        bh = self.side(ys.max() - ys.min(), h)
+        self.refits += 1
+        if bw == w and bh == h:
+            self.box = None  # Cropping would not save anything
+            return
+        # Centered on the person, shifted back inside the frame
+        x0 = int(np.clip((xs.min() + xs.max() - bw) / 2, 0, w - bw))
+        y0 = int(np.clip((ys.min() + ys.max() - bh) / 2, 0, h - bh))
+        self.box = (x0, y0, x0 + bw, y0 + bh)
+
+    def side(self, extent, full):
+        """
+        Box side for a person `extent` pixels across: the extent plus the
+        margin on both ends, rounded up to the next of `sizes` (full-frame fractions).
+        """
+        needed = extent * (1 + 2 * self.margin)
+        for fraction in self.sizes:
+            size = int(round(full * fraction))
+            if size >= needed:
+                return size
+        return full
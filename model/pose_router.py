@@ -0,0 +1,355 @@
+import os
+import cv2
+import mediapipe as mp
+import time
+import asyncio
+import inspect
+import json
+from types import SimpleNamespace
+from fastapi import WebSocket, APIRouter
+from inference import run_inference, shutdown_inference_executor, INFERENCE_WORKERS
+from pose_pool import pose_pool
+from frame_channel import LatestSlot, receive_frames, send_frames
+from joint_angles import landmarks_to_array
+from pose_messages import get_response_mode, frame_message, binary_frame_message, control_message
+from exercise_registry import get_exercise
+from frame_decode import decode_jpeg
+from frame_arena import FrameArena
+from rate_control import RateController
+from landmark_predictor import LandmarkPredictor, to_pose_landmarks
+from pose_roi import PoseROI, ROI_CROP
+from session_recorder import SessionRecorder, RECORDINGS_DIR
+
+# --- MediaPipe Initialization ---
+mp_pose = mp.solutions.pose
+mp_drawing = mp.solutions.drawing_utils
+
+# --- Configuration ---
+SESSION_TIMEOUT = float(os.getenv("POSE_SESSION_TIMEOUT", 30))    # Seconds per session
+# Exercise used when the init message names one that is not in the registry
+# (e.g. a doctor-created title). Unset, such sessions are rejected; when set,
+# they are scored with it but marked as a fallback and not recorded.
+DEFAULT_EXERCISE = os.getenv("POSE_DEFAULT_EXERCISE", "")
+SESSION_END_TIMEOUT = float(os.getenv("POSE_SESSION_END_TIMEOUT", 5))  # Seconds to wait for handlers to confirm a session
+
+router = APIRouter(prefix="/pose")
+
+# Called as handler(result, websocket) when a session ends, with the summary
+# and per-rep log. Handlers run on the event loop and must not block, e.g. the
+# backend queues the result for its database writer here. A handler may return
+# an awaitable that resolves truthy once the session is stored; the final
+# message then tells the client it was recorded.
+SESSION_END_HANDLERS = []
+
+
+@router.on_event("startup")
+async def warm_pose_pool():
+    # Prime Pose instances so the first session does not pay the cold start
+    await pose_pool.warmup()
+
+
+@router.on_event("shutdown")
+async def close_pose_pool():
+    await pose_pool.close()
+    shutdown_inference_executor()
+
+# --- Helper Functions ---
+
+def resolve_exercise(config):
+    """
+    Picks the registry exercise for an init message. "exercise_type" wins over
+    "exercise_id", so clients that send a database id can name the type separately.
+    Returns (exercise, fallback), fallback being True when the name is unknown
+    and DEFAULT_EXERCISE stands in for it. Raises ValueError otherwise.
+    """
+    name = config.get("exercise_type") or config.get("exercise_id")
+    try:
+        return get_exercise(name), False
+    except ValueError:
+        if DEFAULT_EXERCISE:
+            print(f"Unknown exercise {name!r}, scoring it as {DEFAULT_EXERCISE} without recording it")
+            return get_exercise(DEFAULT_EXERCISE), True
+        raise
+
+
+async def run_session_end_handlers(result, websocket):
+    """
+    Calls every session end handler and waits up to SESSION_END_TIMEOUT for
+    the awaitables they return. True when there was at least one and all of
+    them resolved truthy.
+    """
+    pending = []
+    for handler in SESSION_END_HANDLERS:
+        try:
+            outcome = handler(result, websocket)
+        except Exception as e:
+            print(f"Session end handler failed: {e}")
+            continue
+        if inspect.isawaitable(outcome):
+            pending.append(outcome)
+    if not pending:
+        return False
+    try:
+        outcomes = await asyncio.wait_for(asyncio.gather(*pending), SESSION_END_TIMEOUT)
+    except Exception as e:
+        print(f"Session not confirmed as recorded: {e!r}")
+        return False
+    return all(outcomes)
+
+
+def decode_and_detect(pose, frame_bytes, arena, keep_frame=True, roi=None):
+    """
+    Decodes a JPEG frame and runs pose detection on it.
+    Frames larger than POSE_TARGET_SIZE are decoded at 1/2, 1/4 or 1/8 scale,
+    so the annotated frame is returned at that reduced size.
+    The RGB copy for MediaPipe goes into the session arena's reused buffer and
+    overlays are drawn on the decoded BGR frame, so there is one color conversion per frame.
+    With a PoseROI only the person's region is converted and detected, and
+    the landmarks are mapped back to the full frame.
+    Returns (frame, results, landmarks), with the landmark array built once here.
+    With keep_frame=False None is returned in place of the frame.
+    Blocking - meant to run on the inference executor.
+    """
+    frame = arena.count(decode_jpeg(frame_bytes))
+    arena.frames += 1
+    view, box = roi.crop(frame) if roi is not None else (frame, None)
+
+    frame_rgb = cv2.cvtColor(view, cv2.COLOR_BGR2RGB, dst=arena.buffer("rgb", view.shape))
+    frame_rgb.flags.writeable = False
+    results = pose.process(frame_rgb)
+    frame_rgb.flags.writeable = True  # Filled again next frame
+
+    landmarks = landmarks_to_array(results.pose_landmarks)
+    if roi is not None:
+        landmarks = roi.to_full_frame(landmarks, box, frame.shape)
+        roi.update(landmarks, frame.shape)
+        if box is not None and landmarks is not None:
+            results = SimpleNamespace(pose_landmarks=to_pose_landmarks(landmarks))
+    return (frame if keep_frame else None), results, landmarks
+
+
+def track_frame(pose, frame_bytes, arena, predictor, t, keep_frame=True, roi=None):
+    """
+    Returns (frame, results, landmarks) for one frame. The model only runs
+    when the predictor asks for it; on the other frames the landmarks are
+    predicted and wrapped in a results-like object for drawing.
+    Blocking - meant to run on the inference executor.
+    """
+    if predictor.should_infer(frame_bytes, t):
+        frame, results, landmarks = decode_and_detect(pose, frame_bytes, arena, keep_frame, roi)
+        predictor.update(landmarks, t, frame_bytes)
+        return frame, results, landmarks
+
+    landmarks = predictor.predict(t)
+    frame = None
+    if keep_frame:
+        frame = arena.count(decode_jpeg(frame_bytes))
+        arena.frames += 1
+    return frame, SimpleNamespace(pose_landmarks=to_pose_landmarks(landmarks)), landmarks
+
+
+def draw_status(frame, results, rep_counter, current_stage, feedback):
+    """
+    Draws the status box and landmarks on the frame in place.
+    """
+    cv2.rectangle(frame, (0, 0), (320, 150), (245, 117, 16), -1)
+    cv2.putText(frame, f"REPS: {rep_counter}", (10, 40),
+                cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    cv2.putText(frame, f"STAGE: {current_stage}", (10, 80),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    cv2.putText(frame, f"{feedback}", (10, 120),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+    if results.pose_landmarks:
+        mp_drawing.draw_landmarks(
+            frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS,
+            mp_drawing.DrawingSpec(color=(245, 117, 66), thickness=2, circle_radius=2),
+            mp_drawing.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2)
+        )
+    return frame
+
+
+def annotate_and_encode(frame, results, rep_counter, current_stage, feedback, arena=None):
+    """
+    Draws the status box and landmarks on the frame and encodes it as JPEG.
+    Blocking - meant to run on the inference executor.
+    """
+    draw_status(frame, results, rep_counter, current_stage, feedback)
+    _, buffer = cv2.imencode('.jpg', frame)
+    if arena is not None:
+        arena.count(buffer)
+    return buffer.tobytes()
+
+
+# --- WebSocket Endpoint ---
+
+@router.websocket("/ws/analyze")
+async def analyze_pose(websocket: WebSocket):
+    await websocket.accept()
+    print("WebSocket connected")
+
+    # --- 1. Receive Initialization Message ---
+    init_msg = await websocket.receive_text()
+    try:
+        config = json.loads(init_msg)
+        exercise_id = config.get("exercise_id")
+        patient_id = config.get("patient_id")
+        timestamp = config.get("timestamp")
+        # "jpeg" echoes annotated frames, "landmarks"/"binary" send only landmarks and state
+        response_mode = get_response_mode(config)
+        exercise, fallback = resolve_exercise(config)
+    except Exception as e:
+        print(f"Error: Invalid init message. {e}")
+        await websocket.send_text(f"ERROR: Invalid init message. {e}")
+        await websocket.close()
+        return
+
+    print(f"\nAnalyzing exercise: {exercise.exercise_id} ({exercise_id}) for patient {patient_id} on {timestamp}\n")
+
+    # --- 2. Initialize Pose Model and Rep State Machine ---
+    try:
+        pose = await pose_pool.acquire()
+    except asyncio.TimeoutError:
+        print(f"Rejecting session for patient {patient_id}: all {pose_pool.max_size} Pose instances busy")
+        await websocket.send_text("ERROR: server busy")
+        await websocket.close()
+        return
+    start_time = time.time()
+    reps = exercise.create_machine()
+    arena = FrameArena()  # Frame buffers reused across this session's frames
+    rate = RateController()
+    predictor = LandmarkPredictor()  # Skips inference between frames when enabled
+    roi = PoseROI() if ROI_CROP else None
+    # Landmark time series kept for review and re-scoring
+    recorder = SessionRecorder(patient_id, exercise.exercise_id, metadata={"exercise_ref": exercise_id, "fallback": fallback}) \
+        if RECORDINGS_DIR else None
+    frame_id = 0
+
+    final_data_sent = False
+
+    # --- Latest-frame-wins channels ---
+    # Receiving and sending run as their own tasks so a slow inference only
+    # ever works on the newest frame and a slow client only gets the newest reply
+    inbox, outbox = LatestSlot(), LatestSlot()
+    receiver = asyncio.create_task(receive_frames(websocket, inbox))
+    sender = asyncio.create_task(send_frames(websocket, outbox))
+
+    try:
+        while True:
+            # --- 3. Check Timeout ---
+            remaining = SESSION_TIMEOUT - (time.time() - start_time)
+            if remaining <= 0:
+                print("Session timeout.")
+                break
+
+            # --- 4. Take Newest Frame and Decode ---
+            try:
+                frame_bytes = await asyncio.wait_for(inbox.get(), remaining)
+            except asyncio.TimeoutError:
+                print("Session timeout.")
+                break
+
+            if frame_bytes is None or sender.done():
+                print("Client disconnected")
+                break
+
+            # Decode + inference run off the event loop so other sessions keep flowing
+            frame_start = time.perf_counter()
+            now = time.time()
+            frame, results, landmarks = await run_inference(
+                track_frame, pose, frame_bytes, arena, predictor, now,
+                keep_frame=response_mode == "jpeg", roi=roi,
+            )
+            frame_id += 1
+
+            # --- 5. Rep Counting Logic ---
+            # Runs on every frame, detected or predicted
+            reps.step(landmarks, now)
+            if recorder is not None:
+                recorder.append(landmarks, now, reps)
+
+            # --- 6. Send Landmarks or Annotated Frame ---
+            if response_mode in ("landmarks", "binary"):
+                build_message = frame_message if response_mode == "landmarks" else binary_frame_message
+                outbox.put(build_message(
+                    frame_id, landmarks,
+                    angle=reps.value if landmarks is not None else None,
+                    stage=reps.stage, reps=reps.reps,
+                    good_reps=reps.good_reps, feedback=reps.feedback,
+                ))
+            else:
+                annotated = await run_inference(
+                    annotate_and_encode, frame, results, reps.reps, reps.stage, reps.feedback, arena
+                )
+                outbox.put(annotated)
+
+            # --- 7. Tell the Client How Much It Can Send ---
+            rate.record(time.perf_counter() - frame_start)
+            recommendation = rate.poll(pose_pool.in_use / INFERENCE_WORKERS)
+            if recommendation:
+                # Sent directly rather than through the latest-wins outbox,
+                # where the next frame could replace it
+                await websocket.send_text(control_message(*recommendation))
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
+    finally:
+        # --- 8. Flush Last Frame, Send Final Score and Close ---
+        receiver.cancel()
+        outbox.close()
+        try:
+            await sender
+        except Exception:
+            pass  # Client already gone
+
+        summary = reps.summary()
+        result = {
+            "patient_id": patient_id,
+            "exercise_id": exercise_id,
+            "exercise_type": exercise.exercise_id,
+            "fallback": fallback,  # Scored as DEFAULT_EXERCISE, not what the patient did
+            "started": start_time,
+            "ended": time.time(),
+            **summary,
+            "reps": reps.rep_log,
+        }
+        # Before the final message, so it can say whether the score was stored
+        recorded = await run_session_end_handlers(result, websocket)
+
+        if not final_data_sent:
+            final_data = {
+                "status": "session_ended",
+                "total_reps": summary["total_reps"],
+                "good_reps": summary["good_reps"],
+                "average_rep_time": f"{summary['average_rep_time']:.2f}s",
+                "exercise_id": exercise_id,
+                "exercise_type": exercise.exercise_id,
+                "fallback": fallback,
+                "patient_id": patient_id,
+                "recorded": recorded,
+                "frames_received": inbox.accepted,
+                "frames_dropped_in": inbox.dropped,
+                "frames_dropped_out": outbox.dropped,
+            }
+            try:
+                await websocket.send_text(json.dumps(final_data))
+                print(f"Sent final data: {final_data}")
+                print(f"Frame buffers: {arena.stats()}")
+                print(f"Frames inferred: {predictor.inferred}, predicted: {predictor.predicted}")
+            except Exception as e:
+                print(f"Could not send final data: {e}")
+
+        if recorder is not None and recorder.frames:
+            try:
+                path = await run_inference(recorder.save, summary)
+                print(f"Session recorded to {path}")
+            except Exception as e:
+                print(f"Could not record session: {e}")
+
+        await pose_pool.release(pose)
+        try:
+            await websocket.close()
+        except Exception:
+            pass  # Client already closed the connection
+        print("WebSocket connection closed")
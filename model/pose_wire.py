@@ -0,0 +1,131 @@
+"""
+Compact binary framing for per-frame pose messages ("binary" response mode).
+
+Layout (little-endian):
+
+    header   18 bytes   see HEADER below
+    block    n * 4 * (2 or 4) bytes   landmarks as (x, y, z, visibility), float16 or float32
+    feedback feedback_len bytes        UTF-8 text
+
+A full 33-landmark float16 frame is 282 bytes plus feedback, against
+close to 3 KB for the equivalent JSON message.
+"""
+import json
+import struct
+import time
+import numpy as np
+
+WIRE_VERSION = 1
+
+# version, flags, stage, landmark count, frame id, reps, good reps, angle, feedback length
+HEADER = struct.Struct("<BBBBIHHfH")
+
+FLAG_FLOAT32 = 0x01   # Landmark block is float32 instead of float16
+
+# Stage names are sent as a single byte
+STAGES = ("down", "up", "center", "left", "right")
+STAGE_CODES = {name: code for code, name in enumerate(STAGES)}
+UNKNOWN_STAGE = 255
+
+
+def encode_frame(frame_id, landmarks, stage=None, reps=0, good_reps=0,
+                 angle=None, feedback="", dtype=np.float16):
+    """
+    Packs one frame's landmarks and rep state into bytes.
+    `landmarks` is an (n, 4) array of x, y, z, visibility, or None if no person was found.
+    """
+    flags = FLAG_FLOAT32 if np.dtype(dtype) == np.float32 else 0
+    if landmarks is None:
+        block = b""
+        count = 0
+    else:
+        block = np.ascontiguousarray(landmarks, dtype=np.dtype(dtype).newbyteorder("<")).tobytes()
+        count = len(landmarks)
+
+    feedback_bytes = feedback.encode("utf-8") if feedback else b""
+    header = HEADER.pack(
+        WIRE_VERSION,
+        flags,
+        STAGE_CODES.get(stage, UNKNOWN_STAGE),
+        count,
+        frame_id & 0xFFFFFFFF,
+        min(reps, 0xFFFF),
+        min(good_reps, 0xFFFF),
+        float("nan") if angle is None else float(angle),
+        len(feedback_bytes),
+    )
+    return header + block + feedback_bytes
+
+
+def decode_frame(data):
+    """
+    Unpacks bytes produced by `encode_frame` into a dict.
+    Landmarks come back as a float32 (n, 4) array, or None.
+    """
+    (version, flags, stage_code, count, frame_id,
+     reps, good_reps, angle, feedback_len) = HEADER.unpack_from(data)
+    if version != WIRE_VERSION:
+        raise ValueError(f"Unsupported pose wire version: {version}")
+
+    dtype = np.dtype("<f4") if flags & FLAG_FLOAT32 else np.dtype("<f2")
+    offset = HEADER.size
+    landmarks = None
+    if count:
+        landmarks = np.frombuffer(data, dtype=dtype, count=count * 4, offset=offset)
+        landmarks = landmarks.reshape(count, 4).astype(np.float32)
+        offset += count * 4 * dtype.itemsize
+
+    feedback = bytes(data[offset:offset + feedback_len]).decode("utf-8")
+
+    return {
+        "frame_id": frame_id,
+        "stage": STAGES[stage_code] if stage_code < len(STAGES) else None,
+        "reps": reps,
+        "good_reps": good_reps,
+        "angle": None if np.isnan(angle) else angle,
+        "feedback": feedback,
+        "landmarks": landmarks,
+    }
+
+
+def benchmark(iterations=10000):
+    """
+    Compares encode/decode cost and size against the JSON "landmarks" message
+    and checks that a frame survives the round trip.
+    """
+    rng = np.random.default_rng(0)
+    landmarks = rng.random((33, 4), dtype=np.float32)
+    state = {"stage": "up", "reps": 12, "good_reps": 9, "angle": 64.2, "feedback": "Good Rep!"}
+
+    decoded = decode_frame(encode_frame(7, landmarks, **state))
+    assert decoded["frame_id"] == 7 and decoded["reps"] == 12 and decoded["stage"] == "up"
+    assert np.allclose(decoded["landmarks"], landmarks, atol=1e-3)
+
+    def as_json():
+        return json.dumps({
+            "type": "frame", "frame_id": 7,
+            "landmarks": np.round(landmarks, 4).tolist(), **state,
+        })
+
+    cases = [
+        ("json", as_json, json.loads),
+        ("float16", lambda: encode_frame(7, landmarks, **state), decode_frame),
+        ("float32", lambda: encode_frame(7, landmarks, dtype=np.float32, **state), decode_frame),
+    ]
+    for name, encode, decode in cases:
+        message = encode()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            encode()
+        encode_us = (time.perf_counter() - start) / iterations * 1e6
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            decode(message)
+        decode_us = (time.perf_counter() - start) / iterations * 1e6
+
+        print(f"{name:8s} {len(message):5d} bytes  encode {encode_us:6.1f} us  decode {decode_us:6.1f} us")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,67 @@
+import os
+import time
+
+# --- Configuration ---
+CONTROL_INTERVAL = float(os.getenv("POSE_CONTROL_INTERVAL", 2))  # Seconds between control messages, 0 disables them
+MAX_FPS = int(os.getenv("POSE_MAX_FPS", 15))   # Highest capture rate ever recommended
+MIN_FPS = int(os.getenv("POSE_MIN_FPS", 2))    # Lowest capture rate ever recommended
+
+CAPTURE_SIZES = (640, 480, 320)  # Recommended long side of sent frames, stepped down under load
+HEADROOM = 0.8    # Share of the measured frame rate to ask for, leaving room for jitter
+SMOOTHING = 0.2   # Weight of the newest sample in the latency average
+
+
+class RateController:
+    """
+    Works out the capture rate and frame size a session's client should use.
+
+    `record()` is fed every frame's processing time, which includes waiting
+    for an inference thread and so rises with overall server load. Every
+    `interval` seconds `poll()` turns it into a recommendation and returns a
+    (fps, max_size) pair when that recommendation changed, otherwise None.
+    """
+
+    def __init__(self, interval=CONTROL_INTERVAL, max_fps=MAX_FPS, min_fps=MIN_FPS, sizes=CAPTURE_SIZES):
+        self.interval = interval
+        self.max_fps = max_fps
+        self.min_fps = min_fps
+        self.sizes = sizes
+        self.latency = None  # Smoothed seconds per frame
+        self.fps = None
+        self.max_size = None
+        self._next_poll = time.monotonic() + interval
+
+    def record(self, seconds):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += SMOOTHING * (seconds - self.latency)
+
+    def recommend(self, load):
+        """
+        Returns (fps, max_size) for the measured latency, given the server
+        load as live sessions per inference thread.
+        """
+        fps = int(HEADROOM / self.latency) if self.latency else self.max_fps
+        fps = min(self.max_fps, max(self.min_fps, fps))
+
+        # One size step per extra session sharing a thread, and one more
+        # when even this session's own frames are slow
+        step = max(0, int(load + 0.999) - 1)
+        if fps < self.max_fps / 2:
+            step += 1
+        return fps, self.sizes[min(step, len(self.sizes) - 1)]
+
+    def poll(self, load):
+        if not self.interval or self.latency is None:
+            return None
+        now = time.monotonic()
+        if now < self._next_poll:
+            return None
+        self._next_poll = now + self.interval
+
+        fps, max_size = self.recommend(load)
+        if (fps, max_size) == (self.fps, self.max_size):
+            return None
+        self.fps, self.max_size = fps, max_size
+        return fps, max_size
@@ -0,0 +1,214 @@
+"""
+Batched re-scoring of recorded sessions over a grid of thresholds.
+
+Tuning an exercise's thresholds used to mean re-running videos through
+MediaPipe. This replays the rep state machine on stored landmark
+recordings (see session_recorder.py) instead. The metric and check angles
+of every session are measured in one batched call, and the state machine
+is stepped for all sessions and all grid settings at once as (sessions,
+settings) arrays, so a whole grid costs one pass over the frames, e.g.
+
+    python rescore.py --exercise curl --recordings recordings \\
+        --grid start=60,65,70 --grid rom.min_below=50,55,60 --grid checks.0.max_movement=0.1,0.15
+
+Grid parameters are "start", "finish", "rom.min_below", "rom.max_above"
+and "checks.<i>.threshold" / "checks.<i>.max_movement". Anything not in
+the grid keeps its value from exercises.json.
+"""
+import csv
+import itertools
+import argparse
+import numpy as np
+from exercise_registry import get_exercise, AngleAboveCheck, StabilityCheck
+from session_recorder import load_session, list_sessions, RECORDINGS_DIR
+
+
+def default_parameters(definition):
+    """
+    Returns the tunable thresholds of an exercise and their current values.
+    """
+    params = {"start": definition.start[1], "finish": definition.finish[1]}
+    for key in ("min_below", "max_above"):
+        if key in definition.rom:
+            params[f"rom.{key}"] = definition.rom[key]
+    for i, check in enumerate(definition.checks):
+        if isinstance(check, AngleAboveCheck):
+            params[f"checks.{i}.threshold"] = check.threshold
+        elif isinstance(check, StabilityCheck):
+            params[f"checks.{i}.max_movement"] = check.max_movement
+    return params
+
+
+def build_grid(definition, grid):
+    """
+    Expands {name: [values]} into one row per combination. Returns
+    (names, (G, P) float array) with every tunable parameter as a column.
+    """
+    params = default_parameters(definition)
+    unknown = set(grid) - set(params)
+    if unknown:
+        raise ValueError(f"Unknown grid parameter(s) for {definition.exercise_id}: {', '.join(sorted(unknown))}")
+    names = list(params)
+    axes = [grid.get(name, [params[name]]) for name in names]
+    return names, np.array(list(itertools.product(*axes)), dtype=np.float64).reshape(-1, len(names))
+
+
+def measure_sessions(definition, sessions):
+    """
+    Measures every recorded frame in one batched call per session and pads
+    the results to (S, T) arrays. Frames without a detection are marked invalid.
+    """
+    count = max(len(session["landmarks"]) for session in sessions)
+    n_checks = len(definition.checks)
+    values = np.zeros((len(sessions), count))
+    valid = np.zeros((len(sessions), count), dtype=bool)
+    check_values = np.zeros((len(sessions), count, n_checks))   # Angle, or movement since the previous detection
+    check_lengths = np.ones((len(sessions), count, n_checks))   # Anchor-to-end length for stability checks
+
+    for s, session in enumerate(sessions):
+        landmarks = session["landmarks"]
+        n = len(landmarks)
+        ok = ~np.isnan(landmarks).any(axis=(1, 2))
+        value, angles = definition.measure(np.nan_to_num(landmarks))
+        values[s, :n] = value
+        valid[s, :n] = ok
+
+        detected = np.flatnonzero(ok)
+        for c, check in enumerate(definition.checks):
+            if isinstance(check, AngleAboveCheck):
+                check_values[s, :n, c] = angles[:, check.angle_column]
+            else:
+                points = landmarks[:, check.point, :3]
+                moved = np.full(n, -np.inf)
+                moved[detected[1:]] = np.linalg.norm(np.diff(points[detected], axis=0), axis=1)
+                check_values[s, :n, c] = moved
+                check_lengths[s, :n, c] = np.linalg.norm(
+                    landmarks[:, check.anchor, :3] - landmarks[:, check.end, :3], axis=1)
+    return values, valid, check_values, check_lengths
+
+
+def replay(definition, names, grid, values, valid, check_values, check_lengths):
+    """
+    Steps the rep state machine for every (session, setting) pair at once.
+    Returns (reps, good_reps), each (S, G).
+    """
+    column = {name: grid[:, i] for i, name in enumerate(names)}
+    start_condition, finish_condition = definition.start[0], definition.finish[0]
+    n_sessions, n_settings = values.shape[0], grid.shape[0]
+    shape = (n_sessions, n_settings)
+
+    active = np.zeros(shape, dtype=bool)
+    reps = np.zeros(shape, dtype=np.int64)
+    good_reps = np.zeros(shape, dtype=np.int64)
+    rep_min = np.full(shape, np.inf)
+    rep_max = np.full(shape, -np.inf)
+    has_prev = np.zeros(shape, dtype=bool)
+    moved = np.full(shape + (len(definition.checks),), -np.inf)
+    stability = [c for c, check in enumerate(definition.checks) if isinstance(check, StabilityCheck)]
+
+    for t in range(values.shape[1]):
+        ok = valid[:, t, None]
+        value = values[:, t, None]
+        rep_min = np.where(ok, np.minimum(rep_min, value), rep_min)
+        rep_max = np.where(ok, np.maximum(rep_max, value), rep_max)
+        for c in stability:
+            moved[..., c] = np.where(ok & has_prev, np.maximum(moved[..., c], check_values[:, t, None, c]),
+                                     moved[..., c])
+        has_prev |= ok
+
+        started = ok & ~active & start_condition(value, column["start"])
+        finished = ok & active & finish_condition(value, column["finish"])
+        active = (active | started) & ~finished
+        if not finished.any():
+            continue
+
+        good = np.ones(shape, dtype=bool)
+        if "rom.min_below" in column:
+            good &= rep_min < column["rom.min_below"]
+        if "rom.max_above" in column:
+            good &= rep_max > column["rom.max_above"]
+        for c, check in enumerate(definition.checks):
+            if isinstance(check, AngleAboveCheck):
+                good &= check_values[:, t, None, c] > column[f"checks.{c}.threshold"]
+            else:
+                length = check_lengths[:, t, None, c]
+                ratio = np.divide(moved[..., c], length, out=np.zeros(shape), where=length > 0)
+                good &= ~((length > 0) & (ratio > column[f"checks.{c}.max_movement"]))
+
+        reps += finished
+        good_reps += finished & good
+        rep_min[finished] = np.inf
+        rep_max[finished] = -np.inf
+        moved[finished] = -np.inf
+        has_prev[finished] = False
+
+    return reps, good_reps
+
+
+def rescore(exercise_type, paths, grid):
+    """
+    Re-scores the recorded sessions in `paths` for every combination in `grid`.
+    Returns one result dict per setting.
+    """
+    definition = get_exercise(exercise_type)
+    sessions = [session for session in map(load_session, paths)
+                if session["meta"]["exercise_id"] == definition.exercise_id and len(session["landmarks"])]
+    if not sessions:
+        raise ValueError(f"No recorded {definition.exercise_id} sessions found")
+
+    names, settings = build_grid(definition, grid)
+    reps, good_reps = replay(definition, names, settings, *measure_sessions(definition, sessions))
+
+    defaults = default_parameters(definition)
+    results = []
+    for g, row in enumerate(settings):
+        total, good = int(reps[:, g].sum()), int(good_reps[:, g].sum())
+        params = dict(zip(names, row.tolist()))
+        results.append({
+            **params,
+            "sessions": len(sessions),
+            "reps": total,
+            "good_reps": good,
+            "good_ratio": round(good / total, 4) if total else 0.0,
+            "default": params == defaults,
+        })
+    return results
+
+
+def parse_grid(specs):
+    """
+    Parses "name=v1,v2,..." options into {name: [values]}.
+    """
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        grid[name.strip()] = [float(v) for v in values.split(",")]
+    return grid
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score recorded sessions over a threshold grid")
+    parser.add_argument("--exercise", type=str, required=True, help="Exercise whose recordings are re-scored")
+    parser.add_argument("--recordings", type=str, default=RECORDINGS_DIR,
+                        help="Recordings directory (defaults to POSE_RECORDINGS_DIR)")
+    parser.add_argument("--patient", type=str, default=None, help="Only this patient's sessions")
+    parser.add_argument("--grid", action="append", default=[],
+                        help='Threshold values to try, e.g. "start=60,65,70" (repeatable)')
+    parser.add_argument("--output", type=str, default=None, help="Write every setting's result to this CSV")
+    args = parser.parse_args()
+
+    results = rescore(args.exercise, list_sessions(args.recordings, args.patient), parse_grid(args.grid))
+
+    names = [key for key in results[0] if key not in ("sessions", "reps", "good_reps", "good_ratio", "default")]
+    print(f"{results[0]['sessions']} session(s), {len(results)} setting(s)")
+    print("  ".join(f"{name:>22}" for name in names) + f"  {'reps':>6} {'good':>6} {'ratio':>6}")
+    for result in results:
+        marker = "  <- current" if result["default"] else ""
+        print("  ".join(f"{result[name]:>22g}" for name in names)
+              + f"  {result['reps']:>6} {result['good_reps']:>6} {result['good_ratio']:>6.2f}{marker}")
+
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
@@ -0,0 +1,160 @@
+"""
+Compact per-session landmark recordings.
+
+A `SessionRecorder` appends every frame's landmarks (float16, NaN when
+nobody was detected), its timestamp and each rep state transition into
+preallocated chunks, and writes them as one compressed npz per session:
+
+    <POSE_RECORDINGS_DIR>/<patient_id>/<session_id>.npz
+
+A 30 second session at 30 fps is about 240 KB before compression, so
+sessions can be reviewed and re-scored later without storing video.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import numpy as np
+from joint_angles import NUM_LANDMARKS
+
+# --- Configuration ---
+RECORDINGS_DIR = os.getenv("POSE_RECORDINGS_DIR")  # Unset disables recording
+CHUNK_FRAMES = 256
+SAFE_NAME = re.compile(r"^[A-Za-z0-9_-]+$")  # Patient and session ids allowed as path components
+
+
+def safe_name(value, default="unknown"):
+    """
+    Returns `value` as a single path component. Anything but an int or a
+    plain slug (e.g. "../x" or an absolute path from a client) becomes `default`.
+    """
+    if isinstance(value, bool) or value is None:
+        return default
+    name = str(value)
+    return name if isinstance(value, int) or SAFE_NAME.match(name) else default
+
+
+def path_under(root, *parts):
+    """
+    Joins `parts` onto `root` and raises ValueError if the result leaves `root`.
+    """
+    base = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(base, *parts))
+    if os.path.commonpath([base, path]) != base:
+        raise ValueError(f"Recording path escapes {root}")
+    return path
+
+
+class SessionRecorder:
+    """
+    Collects one session's landmark time series in memory until `save()`.
+    """
+
+    def __init__(self, patient_id, exercise_id, root=RECORDINGS_DIR, session_id=None, metadata=None):
+        self.root = root
+        # Client supplied, so only ever used as one sanitized path component
+        self.patient_id = safe_name(patient_id)
+        self.exercise_id = exercise_id
+        self.started = time.time()
+        self.session_id = safe_name(session_id, None) or f"{int(self.started * 1000)}_{uuid.uuid4().hex[:8]}"
+        self.metadata = metadata or {}
+
+        self._chunks = []
+        self._chunk = None
+        self._used = CHUNK_FRAMES
+        self._times = []
+        self.frames = 0
+
+        self._last_state = None
+        self.transitions = []  # (frame, t, stage, reps, good_reps)
+
+    @property
+    def path(self):
+        return path_under(self.root, self.patient_id, f"{self.session_id}.npz")
+
+    def append(self, landmarks, t, reps=None):
+        """
+        Adds one frame. `landmarks` is the (33, 4) array or None, `reps` the
+        session's RepStateMachine whose stage changes are recorded.
+        """
+        if self._used == CHUNK_FRAMES:
+            self._chunk = np.full((CHUNK_FRAMES, NUM_LANDMARKS, 4), np.nan, dtype=np.float16)
+            self._chunks.append(self._chunk)
+            self._used = 0
+        if landmarks is not None:
+            self._chunk[self._used] = landmarks
+        self._used += 1
+        self._times.append(t)
+
+        if reps is not None:
+            state = (reps.stage, reps.reps, reps.good_reps)
+            if state != self._last_state:
+                self.transitions.append((self.frames, t, *state))
+                self._last_state = state
+        self.frames += 1
+
+    def landmarks(self):
+        """
+        Returns the recorded (T, 33, 4) float16 array.
+        """
+        if not self._chunks:
+            return np.empty((0, NUM_LANDMARKS, 4), dtype=np.float16)
+        return np.concatenate(self._chunks)[:self.frames]
+
+    def save(self, summary=None):
+        """
+        Writes the session to `path` and returns it. Blocking file I/O.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        transitions = list(zip(*self.transitions)) or [[], [], [], [], []]
+        meta = {
+            "patient_id": self.patient_id,
+            "session_id": self.session_id,
+            "exercise_id": self.exercise_id,
+            "started": self.started,
+            "frames": self.frames,
+            "summary": summary,
+            **self.metadata,
+        }
+        np.savez_compressed(
+            self.path,
+            landmarks=self.landmarks(),
+            t=np.asarray(self._times, dtype=np.float64),
+            transition_frame=np.asarray(transitions[0], dtype=np.int32),
+            transition_t=np.asarray(transitions[1], dtype=np.float64),
+            transition_stage=np.asarray(transitions[2], dtype=str),
+            transition_reps=np.asarray(transitions[3], dtype=np.int32),
+            transition_good_reps=np.asarray(transitions[4], dtype=np.int32),
+            meta=np.asarray(json.dumps(meta)),
+        )
+        return self.path
+
+
+def load_session(path):
+    """
+    Loads a recorded session. Landmarks come back as float32 with NaN rows
+    for frames where nobody was detected.
+    """
+    with np.load(path) as data:
+        session = {key: data[key] for key in data.files}
+    session["landmarks"] = session["landmarks"].astype(np.float32)
+    session["meta"] = json.loads(str(session["meta"]))
+    return session
+
+
+def list_sessions(root=RECORDINGS_DIR, patient_id=None):
+    """
+    Returns the paths of recorded sessions, optionally for one patient, oldest first.
+    """
+    if not root or not os.path.isdir(root):
+        return []
+    if patient_id is not None and safe_name(patient_id, None) is None:
+        return []
+    patients = [safe_name(patient_id)] if patient_id is not None else sorted(os.listdir(root))
+    paths = []
+    for patient in patients:
+        folder = path_under(root, patient)
+        if os.path.isdir(folder):
+            paths.extend(os.path.join(folder, name) for name in sorted(os.listdir(folder)) if name.endswith(".npz"))
+    return paths
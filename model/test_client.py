@@ -4,15 +4,58 @@ import asyncio
 import json
 import time
 import numpy as np
+import mediapipe as mp
+from pose_wire import decode_frame
 
 # --- Configuration ---
 WEBSOCKET_URI = "ws://127.0.0.1:8000/pose/ws/analyze"
 VIDEO_SOURCE = 0  # Use 0 for your webcam
 # VIDEO_SOURCE = "path/to/test_video.mp4" # Or use a video file
 EXERCISE_TO_TEST = "curl"  # Change to "lateral_raise" to test the other
+RESPONSE_MODE = "jpeg"  # "landmarks" (JSON) or "binary" to receive only landmarks and draw the overlay here
 # ---------------------
 
-async def send_frames(websocket, video_source, exercise_id):
+POSE_CONNECTIONS = mp.solutions.pose.POSE_CONNECTIONS
+
+# Capture rate and frame size, updated by the server's control messages
+capture = {"fps": 30, "max_size": None}
+
+
+def fit_frame(frame, max_size):
+    """
+    Shrinks a frame so its long side is at most `max_size` pixels.
+    """
+    h, w = frame.shape[:2]
+    if not max_size or max(h, w) <= max_size:
+        return frame
+    scale = max_size / max(h, w)
+    return cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+
+def draw_overlay(frame, message):
+    """
+    Draws the landmarks and rep state from a "landmarks" or "binary" mode message onto a local frame.
+    """
+    h, w = frame.shape[:2]
+    landmarks = message.get("landmarks")
+    if landmarks is not None and len(landmarks):
+        points = [(int(x * w), int(y * h)) for x, y, _, _ in landmarks]
+        for start, end in POSE_CONNECTIONS:
+            cv2.line(frame, points[start], points[end], (245, 66, 230), 2)
+        for point in points:
+            cv2.circle(frame, point, 2, (245, 117, 66), -1)
+
+    cv2.rectangle(frame, (0, 0), (320, 150), (245, 117, 16), -1)
+    cv2.putText(frame, f"REPS: {message.get('reps', 0)}", (10, 40),
+                cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    cv2.putText(frame, f"STAGE: {message.get('stage', '')}", (10, 80),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    cv2.putText(frame, f"{message.get('feedback', '')}", (10, 120),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    return frame
+
+
+async def send_frames(websocket, video_source, exercise_id, last_sent):
     """
     Connects, sends init config, and then streams video frames.
     """
@@ -21,7 +64,8 @@ async def send_frames(websocket, video_source, exercise_id):
         config = {
             "exercise_id": exercise_id,
             "patient_id": "test_patient_001",
-            "timestamp": time.time()
+            "timestamp": time.time(),
+            "response_mode": RESPONSE_MODE,
         }
         await websocket.send(json.dumps(config))
         print(f"Client: Sent init config for {exercise_id}")
@@ -38,17 +82,20 @@ async def send_frames(websocket, video_source, exercise_id):
                 print("Client: Video source finished.")
                 break
             
-            # Encode frame as JPEG
+            # Encode frame as JPEG, at the size the server asked for
+            frame = fit_frame(frame, capture["max_size"])
             _, buffer = cv2.imencode('.jpg', frame)
             
+            last_sent["frame"] = frame
+
             try:
                 await websocket.send(buffer.tobytes())
             except websockets.exceptions.ConnectionClosed:
                 print("Client: Send failed, connection closed.")
                 break
             
-            # Slow down to ~30fps, also allows other async tasks to run
-            await asyncio.sleep(0.03) 
+            # Send at the rate the server asked for, also allows other async tasks to run
+            await asyncio.sleep(1 / capture["fps"])
             
     except Exception as e:
         print(f"Client Send Error: {e}")
@@ -58,33 +105,50 @@ async def send_frames(websocket, video_source, exercise_id):
         print("Client: Send task finished.")
 
 
-async def receive_frames(websocket):
+async def receive_frames(websocket, last_sent):
     """
     Receives messages from the server and displays them.
-    Handles both image bytes and the final score string.
+    Handles image bytes, per-frame landmark messages and the final score string.
     """
     try:
         while True:
             response = await websocket.recv()
+            img = None
             
             if isinstance(response, str):
-                # This is the final JSON score
-                print("\n--- CLIENT: FINAL SCORE RECEIVED ---")
-                print(json.dumps(json.loads(response), indent=2))
-                print("--------------------------------------")
-                break # Got the final score, we're done.
+                message = json.loads(response)
+                if message.get("type") == "control":
+                    # Server recommends a new capture rate and size
+                    capture["fps"], capture["max_size"] = message["fps"], message["max_size"]
+                    print(f"Client: Capture set to {message['fps']} fps, max {message['max_size']}px")
+                    continue
+                elif message.get("type") == "frame":
+                    # Landmarks mode: draw the overlay on the frame we last sent
+                    if last_sent["frame"] is not None:
+                        img = draw_overlay(last_sent["frame"].copy(), message)
+                else:
+                    # This is the final JSON score
+                    print("\n--- CLIENT: FINAL SCORE RECEIVED ---")
+                    print(json.dumps(message, indent=2))
+                    print("--------------------------------------")
+                    break # Got the final score, we're done.
             
+            elif RESPONSE_MODE == "binary":
+                # Packed landmarks and rep state
+                if last_sent["frame"] is not None:
+                    img = draw_overlay(last_sent["frame"].copy(), decode_frame(response))
+
             else:
                 # This is image bytes
                 np_arr = np.frombuffer(response, np.uint8)
                 img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
                 
-                if img is not None:
-                    cv2.imshow('Test Client - Receiving', img)
-                    # Press 'q' to quit the client
-                    if cv2.waitKey(1) & 0xFF == ord('q'):
-                        print("Client: User pressed 'q', stopping.")
-                        break
+            if img is not None:
+                cv2.imshow('Test Client - Receiving', img)
+                # Press 'q' to quit the client
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    print("Client: User pressed 'q', stopping.")
+                    break
                 
     except websockets.exceptions.ConnectionClosed as e:
         print(f"Client Receive: Connection closed (Code: {e.code})")
@@ -105,8 +169,9 @@ async def main_test():
             print("Client: Connected!")
             
             # Create and run send and receive tasks concurrently
-            send_task = asyncio.create_task(send_frames(websocket, VIDEO_SOURCE, EXERCISE_TO_TEST))
-            receive_task = asyncio.create_task(receive_frames(websocket))
+            last_sent = {"frame": None}  # Frame the landmarks overlay is drawn on
+            send_task = asyncio.create_task(send_frames(websocket, VIDEO_SOURCE, EXERCISE_TO_TEST, last_sent))
+            receive_task = asyncio.create_task(receive_frames(websocket, last_sent))
             
             # Wait for either task to finish
             done, pending = await asyncio.wait(
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The model modules are flat files imported by name, as the CLIs do
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,25 @@
+import csv
+from batch_analyze import recording_id, write_rows
+
+
+def test_recording_ids_follow_the_relative_path(tmp_path):
+    first = recording_id(str(tmp_path / "monday" / "clip.mp4"), str(tmp_path))
+    second = recording_id(str(tmp_path / "tuesday" / "clip.mp4"), str(tmp_path))
+
+    assert first != second
+    assert first.startswith("monday_clip_")
+    assert recording_id(str(tmp_path / "monday" / "clip.mp4"), str(tmp_path)) == first
+    assert recording_id(str(tmp_path / "../a b.mp4"), str(tmp_path)).startswith("a_b_")
+
+
+def test_metric_columns_are_named_after_their_kind(tmp_path):
+    output = tmp_path / "reps.csv"
+    write_rows([
+        {"video": "a.mp4", "exercise": "curl", "rep": 1, "min_angle": 40.0, "max_angle": 170.0},
+        {"video": "b.mp4", "exercise": "neck_turn", "rep": 1, "min_offset": -0.1, "max_offset": 0.1},
+    ], str(output))
+
+    with open(output, newline="") as f:
+        angle, offset = list(csv.DictReader(f))
+    assert (angle["max_angle"], angle["max_offset"]) == ("170.0", "")
+    assert (offset["min_offset"], offset["min_angle"]) == ("-0.1", "")
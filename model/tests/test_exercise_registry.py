@@ -0,0 +1,107 @@
+import math
+import numpy as np
+import pytest
+from exercise_registry import get_exercise
+from joint_angles import NUM_LANDMARKS, compile_indices
+
+SHOULDER, ELBOW, WRIST = compile_indices("LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST")
+FPS = 30
+
+
+def curl_frame(angle, elbow_shift=0.0):
+    """
+    Landmarks whose left elbow angle is `angle` degrees, with the upper arm
+    pointing straight up from the elbow. `elbow_shift` moves the elbow sideways.
+    """
+    landmarks = np.zeros((NUM_LANDMARKS, 4))
+    landmarks[:, 3] = 1.0
+    elbow = np.array([0.5 + elbow_shift, 0.5])
+    landmarks[SHOULDER, :2] = elbow + [0.0, -0.2]
+    landmarks[ELBOW, :2] = elbow
+    theta = math.radians(angle)
+    landmarks[WRIST, :2] = elbow + [0.2 * math.sin(theta), -0.2 * math.cos(theta)]
+    return landmarks
+
+
+def curl_rep(bottom=40, top=170, steps=10):
+    down = np.linspace(top, bottom, steps)
+    return list(down) + list(down[::-1])
+
+
+def run(machine, frames):
+    for i, landmarks in enumerate(frames):
+        machine.step(landmarks, i / FPS)
+    return machine
+
+
+def test_curl_frame_has_requested_angle():
+    value, _ = get_exercise("curl").measure(curl_frame(40))
+    assert value == pytest.approx(40, abs=1e-6)
+
+
+def test_counts_good_reps():
+    angles = [170] + curl_rep() * 3
+    machine = run(get_exercise("curl").create_machine(), [curl_frame(a) for a in angles])
+
+    assert machine.reps == 3
+    assert machine.good_reps == 3
+    assert machine.stage == "down"
+    assert machine.feedback == "Good Rep!"
+    assert [rep["rep"] for rep in machine.rep_log] == [1, 2, 3]
+    assert all(rep["min_value"] < 60 and rep["max_value"] > 160 for rep in machine.rep_log)
+    assert machine.summary()["average_rep_time"] > 0
+
+
+def test_missed_and_nan_frames_are_skipped():
+    angles = [170] + curl_rep()
+    frames = [curl_frame(a) for a in angles]
+    nan_frame = curl_frame(40)
+    nan_frame[WRIST, :2] = np.nan
+    # Mid-rep: nobody detected, then an unusable detection
+    frames[10:10] = [None, nan_frame, None]
+
+    machine = run(get_exercise("curl").create_machine(), frames)
+
+    assert machine.reps == 1
+    assert machine.good_reps == 1
+    assert not math.isnan(machine.value)
+    assert machine.frame == len(frames) - 1
+
+
+def test_shallow_rep_fails_rom():
+    angles = [170] + curl_rep(bottom=65)
+    machine = run(get_exercise("curl").create_machine(), [curl_frame(a) for a in angles])
+
+    assert machine.reps == 1
+    assert machine.good_reps == 0
+    assert machine.feedback == "Bad ROM!"
+    assert machine.rep_log[0]["good"] is False
+
+
+def test_moving_elbow_fails_stability_check():
+    angles = [170] + curl_rep()
+    frames = [curl_frame(a, elbow_shift=0.1 if i == 10 else 0.0) for i, a in enumerate(angles)]
+    machine = run(get_exercise("curl").create_machine(), frames)
+
+    assert machine.reps == 1
+    assert machine.good_reps == 0
+    assert machine.feedback == "Elbow moving!"
+
+
+def test_aliases_and_unknown_exercises():
+    assert get_exercise("Bicep Curl").exercise_id == "curl"
+    assert get_exercise("Lateral Raises").exercise_id == "lateral_raise"
+    assert get_exercise("Squats").exercise_id == "squat"
+    with pytest.raises(ValueError):
+        get_exercise("not an exercise")
+
+
+def test_nan_frame_does_not_start_a_rep():
+    angles = [170] + curl_rep()
+    frames = [curl_frame(a, elbow_shift=0.1 if i == 10 else 0.0) for i, a in enumerate(angles)]
+    frames.insert(5, np.full((NUM_LANDMARKS, 4), np.nan))
+    machine = run(get_exercise("curl").create_machine(), frames)
+
+    assert machine.reps == 1
+    assert machine.rep_log[0]["start_frame"] > 5
+    assert machine.feedback == "Elbow moving!"
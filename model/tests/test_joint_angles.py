@@ -0,0 +1,23 @@
+import numpy as np
+from types import SimpleNamespace
+from joint_angles import NUM_LANDMARKS, compile_triplets, joint_angles, landmarks_to_array
+
+TRIPLETS = compile_triplets(("LEFT_HIP", "LEFT_SHOULDER", "LEFT_ELBOW"),
+                            ("LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST"),
+                            ("LEFT_HIP", "LEFT_HIP", "LEFT_KNEE"))
+
+
+def test_single_frame_matches_batched_path():
+    frames = np.random.default_rng(0).random((50, NUM_LANDMARKS, 4)).astype(np.float32)
+    frames[::7, 13] = np.nan  # missing elbow gives 0 degrees on both paths
+    batched = joint_angles(frames, TRIPLETS)
+    single = np.array([joint_angles(frame, TRIPLETS) for frame in frames])
+    assert np.allclose(single, batched, atol=1e-3)
+    assert (single[:, 2] == 0).all()  # degenerate triplet
+
+
+def test_landmarks_to_array_keeps_landmark_order():
+    values = np.random.default_rng(1).random((NUM_LANDMARKS, 4))
+    pose_landmarks = SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=z, visibility=v) for x, y, z, v in values])
+    assert np.allclose(landmarks_to_array(pose_landmarks), values)
+    assert landmarks_to_array(None) is None
@@ -0,0 +1,32 @@
+import asyncio
+import pytest
+from pose_pool import PosePool
+
+
+class FakePose:
+    def process(self, frame):
+        pass
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_acquire_times_out_when_pool_is_full():
+    async def main():
+        pool = PosePool(max_size=1, warm_size=0, idle_timeout=0, acquire_timeout=0.05, factory=FakePose)
+        pose = await pool.acquire()
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.acquire()
+        assert pool.in_use == 1
+
+        # The timed-out wait must not hold on to a slot
+        await pool.release(pose)
+        pose = await pool.acquire()
+        assert pool.in_use == 1
+        await pool.release(pose)
+        await pool.close()
+
+    asyncio.run(main())
@@ -0,0 +1,40 @@
+import numpy as np
+from frame_arena import FrameArena
+from joint_angles import NUM_LANDMARKS
+from pose_roi import PoseROI
+
+FRAME_SHAPE = (480, 640, 3)
+
+
+def person_at(x, y, size=0.2):
+    """
+    Full-frame landmarks spread over a `size` square centered on (x, y).
+    """
+    landmarks = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+    landmarks[:, 0] = np.linspace(x - size / 2, x + size / 2, NUM_LANDMARKS)
+    landmarks[:, 1] = np.linspace(y - size / 2, y + size / 2, NUM_LANDMARKS)
+    landmarks[:, 3] = 1.0
+    return landmarks
+
+
+def test_refit_moves_box_but_keeps_its_size():
+    roi = PoseROI(margin=0.3)
+    arena = FrameArena()
+    frame = np.zeros(FRAME_SHAPE, dtype=np.uint8)
+    shapes = set()
+    for x in np.linspace(0.2, 0.8, 30):  # Walks across the frame, forcing refits
+        roi.update(person_at(x, 0.5), FRAME_SHAPE)
+        view, _ = roi.crop(frame)
+        shapes.add(view.shape)
+        arena.buffer("rgb", view.shape)
+
+    assert roi.refits > 3
+    assert shapes == {(240, 320, 3)}  # Half the frame each way
+    assert arena.allocations == 1
+
+
+def test_large_person_uses_the_full_frame():
+    roi = PoseROI(margin=0.3)
+    roi.update(person_at(0.5, 0.5, size=0.8), FRAME_SHAPE)
+
+    assert roi.box is None
@@ -0,0 +1,19 @@
+import pytest
+import pose_router
+from pose_router import resolve_exercise
+
+
+def test_unknown_title_is_rejected(monkeypatch):
+    monkeypatch.setattr(pose_router, "DEFAULT_EXERCISE", "")
+
+    with pytest.raises(ValueError):
+        resolve_exercise({"exercise_id": 12, "exercise_type": "Shoulder Press"})
+
+
+def test_unknown_title_with_default_is_marked_as_fallback(monkeypatch):
+    monkeypatch.setattr(pose_router, "DEFAULT_EXERCISE", "curl")
+
+    exercise, fallback = resolve_exercise({"exercise_id": 12, "exercise_type": "Shoulder Press"})
+
+    assert (exercise.exercise_id, fallback) == ("curl", True)
+    assert resolve_exercise({"exercise_id": 3, "exercise_type": "Lateral Raises"})[1] is False